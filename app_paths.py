@@ -0,0 +1,11 @@
+"""Carpeta de datos de la aplicación.
+
+Las cachés, los registros de campaña, los archivos de auditoría y los cupos
+diarios se guardan en subcarpetas de :data:`APP_DIR` (``%LOCALAPPDATA%`` en
+Windows, la carpeta personal en otros sistemas).
+"""
+import os
+
+APP_DIR = os.path.join(
+    os.environ.get('LOCALAPPDATA', os.path.expanduser('~')), 'EnvioMasivoCorreos'
+)
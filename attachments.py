@@ -0,0 +1,96 @@
+"""Adjuntos compartidos por todos los correos de una campaña.
+
+Cada archivo se lee con ``mmap`` (sin copiarlo entero a memoria de Python),
+se codifica en base64 una única vez y la parte MIME resultante se guarda en
+una caché del proceso. Todos los correos, de esta y de las siguientes
+campañas, reutilizan esos mismos bytes: el coste de un adjunto depende del
+número de archivos distintos, no del número de destinatarios. La caché
+guarda solo la última versión de cada archivo y lo libera al quitarlo de la
+lista de adjuntos (:func:`forget_attachment`).
+"""
+import base64
+import mimetypes
+import mmap
+import os
+import threading
+from urllib.parse import quote
+
+# Caracteres por línea en base64 (RFC 2045)
+BASE64_LINE = 76
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _wrap_base64(data):
+    """Codifica ``data`` (bytes o memoryview) en base64 con líneas CRLF"""
+    encoded = base64.b64encode(data)
+    return b"\r\n".join(
+        encoded[i:i + BASE64_LINE] for i in range(0, len(encoded), BASE64_LINE)
+    )
+
+
+class SharedAttachment:
+    """Adjunto leído y codificado una sola vez; ``part`` es la parte MIME completa"""
+
+    def __init__(self, path, mimetype=None):
+        self.path = os.path.abspath(path)
+        self.filename = os.path.basename(path)
+        self.mimetype = (mimetype or mimetypes.guess_type(self.filename)[0]
+                         or 'application/octet-stream')
+        self.size = os.path.getsize(self.path)
+        self.part = self._headers() + self._encode()
+
+    def _headers(self):
+        if self.filename.isascii():
+            disposition = f'attachment; filename="{self.filename}"'
+        else:
+            # Nombres con acentos: parámetro codificado según RFC 2231
+            disposition = f"attachment; filename*=utf-8''{quote(self.filename)}"
+        return (
+            f"Content-Type: {self.mimetype}\r\n"
+            f"MIME-Version: 1.0\r\n"
+            f"Content-Transfer-Encoding: base64\r\n"
+            f"Content-Disposition: {disposition}\r\n\r\n"
+        ).encode('ascii')
+
+    def _encode(self):
+        if self.size == 0:
+            return b""  # mmap no admite archivos vacíos
+        with open(self.path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    return _wrap_base64(view)
+
+
+def get_attachment(path):
+    """Devuelve el adjunto codificado, desde la caché si el archivo no cambió"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+
+    with _cache_lock:
+        attachment = _cache.get(key)
+        if attachment is None:
+            # El archivo cambió: la versión anterior ya no se va a enviar
+            _forget_locked(path)
+            attachment = _cache[key] = SharedAttachment(path)
+    return attachment
+
+
+def _forget_locked(path):
+    for key in [key for key in _cache if key[0] == path]:
+        del _cache[key]
+
+
+def forget_attachment(path):
+    """Libera de la caché las versiones codificadas de un archivo"""
+    path = os.path.abspath(path)
+    with _cache_lock:
+        _forget_locked(path)
+
+
+def clear_cache():
+    """Libera todos los adjuntos codificados"""
+    with _cache_lock:
+        _cache.clear()
@@ -1,11 +1,48 @@
+import importlib
 import os
+import queue
 import sys
+import threading
+import time
+from collections import deque
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-import pandas as pd
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from metrics import STAGES, SendMetrics, format_duration
+from rate_limit import provider_limits
+from sender_accounts import account_label
+from virtual_tree import VirtualTreeview
+
+# pandas, la lectura de Excel y la pila SMTP/MIME se importan al usarse: la
+# ventana aparece sin esperarlos y warm_up los carga en segundo plano
+HEAVY_MODULES = ('pandas', 'data_loader', 'contacts_cache', 'template_engine',
+                 'live_preview', 'campaign', 'openpyxl')
+
+# Líneas que conserva el registro de la pestaña de envío y cada cuánto se
+# actualiza (ms); el registro completo queda en el archivo de send_log
+LOG_MAX_LINES = 2000
+LOG_FLUSH_MS = 250
+
+# Cada cuánto se actualiza el panel de rendimiento durante el envío (ms)
+METRICS_REFRESH_MS = 1000
+
+# Pausa de escritura tras la que se actualiza la vista previa (ms)
+PREVIEW_DELAY_MS = 300
+
+# Espera tras mostrar la ventana antes de precargar los módulos pesados (ms)
+WARM_UP_DELAY_MS = 100
+
+# Espera máxima al cerrar la ventana para que el envío en curso se detenga (s)
+CLOSE_TIMEOUT_SECONDS = 30
+
+def warm_up(modules=HEAVY_MODULES):
+    """Importa los módulos pesados en un hilo aparte para que el primer uso sea inmediato"""
+    def run():
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass  # Motor de Excel opcional: el error se mostrará al abrir el archivo
+    threading.Thread(target=run, daemon=True).start()
 
 def resource_path(relative_path):
     """Obtiene la ruta absoluta al recurso, funciona para desarrollo y para PyInstaller"""
@@ -40,11 +77,32 @@ class EmailSenderApp:
             'servidor': '',
             'puerto': 587,
             'email': '',
-            'password': ''
+            'password': '',
+            'conexiones': 4,
+            'proveedor': ''
         }
         
+        # Cuentas entre las que se reparte el envío (configuraciones SMTP)
+        self.sender_accounts = []
+        
         self.df_clientes = None
         self.current_excel_path = ""
+        self.engine = None  # Motor de envío en curso (SendEngine)
+        self.attachments = []  # Rutas de los archivos adjuntos
+        self.loader_events = None  # Cola de la carga de archivo en curso
+        self.loaded_chunks = []
+        self.load_seconds = 0.0  # Tiempo que tardó la lectura del archivo
+        self.last_metrics = None  # Métricas del último envío (SendMetrics)
+        
+        # Vista previa en vivo: filas de muestra en caché y fila mostrada
+        self.preview_renderer = None
+        self.preview_row = 0
+        self.preview_job = None  # Actualización pendiente (after)
+        self.preview_shown = ""  # Texto que muestra ahora el widget
+        
+        # Mensajes pendientes de mostrar en el registro; si se acumulan más
+        # de los que caben en el widget, los más antiguos se descartan
+        self.log_buffer = deque(maxlen=LOG_MAX_LINES)
         
         # Crear pestañas
         self.notebook = ttk.Notebook(root)
@@ -56,6 +114,28 @@ class EmailSenderApp:
         self.create_message_tab()
         self.create_send_tab()
         self.create_mapping_tab()  # Nueva pestaña para mapeo de columnas
+        
+        # Volcado periódico del registro de eventos
+        self.root.after(LOG_FLUSH_MS, self.flush_log)
+        
+        # Al cerrar la ventana, detiene el envío y guarda su registro
+        self.root.protocol('WM_DELETE_WINDOW', self.on_close)
+    
+    def on_close(self):
+        """Cierra la aplicación; si hay un envío en curso, lo cancela antes"""
+        if self.engine is not None:
+            if not messagebox.askyesno("Confirmar", "Hay un envío en curso. ¿Cancelarlo y salir?"):
+                return
+            from campaign import close_engine
+            self.engine.cancel()
+            self.engine.join(CLOSE_TIMEOUT_SECONDS)
+            # Escribe en disco lo enviado y el cupo diario para poder reanudar
+            try:
+                close_engine(self.engine)
+            except Exception as e:
+                messagebox.showerror("Error", f"No se pudo guardar el registro de la campaña: {str(e)}")
+            self.engine = None
+        self.root.destroy()
     
     def create_config_tab(self):
         """Crea la pestaña de configuración SMTP"""
@@ -94,28 +174,66 @@ class EmailSenderApp:
         self.password_entry = ttk.Entry(frame, show="*")
         self.password_entry.grid(row=4, column=1, padx=5, pady=5, sticky='we')
         
-        # Botón de prueba
-        ttk.Button(frame, text="Probar Conexión", command=self.test_connection).grid(row=5, column=1, pady=10)
+        # Conexiones simultáneas
+        ttk.Label(frame, text="Conexiones simultáneas:").grid(row=5, column=0, padx=5, pady=5, sticky='e')
+        self.pool_size_var = tk.StringVar(value=str(self.smtp_config['conexiones']))
+        ttk.Spinbox(frame, from_=1, to=20, textvariable=self.pool_size_var).grid(row=5, column=1, padx=5, pady=5, sticky='we')
+        
+        # Cupo diario propio de la cuenta (si difiere del límite del proveedor)
+        ttk.Label(frame, text="Límite diario (opcional):").grid(row=6, column=0, padx=5, pady=5, sticky='e')
+        self.daily_limit_entry = ttk.Entry(frame)
+        self.daily_limit_entry.grid(row=6, column=1, padx=5, pady=5, sticky='we')
+        
+        # Límites de envío del proveedor
+        self.limits_label = ttk.Label(frame, text="Límites de envío: sin límite conocido")
+        self.limits_label.grid(row=7, column=1, padx=5, pady=5, sticky='w')
+        
+        # Botones de prueba y de alta en la lista de cuentas
+        config_buttons = ttk.Frame(frame)
+        config_buttons.grid(row=8, column=1, pady=10)
+        ttk.Button(config_buttons, text="Probar Conexión", command=self.test_connection).pack(side='left', padx=5)
+        ttk.Button(config_buttons, text="Agregar Cuenta", command=self.add_account).pack(side='left', padx=5)
+        
+        # Varias cuentas: el envío se reparte entre ellas, cada una con su cupo
+        accounts_frame = ttk.LabelFrame(tab, text="Cuentas de Envío")
+        accounts_frame.pack(pady=10, padx=10, fill='both', expand=True)
+        
+        self.accounts_info = ttk.Label(
+            accounts_frame, text="Sin cuentas agregadas: se usará la cuenta configurada arriba"
+        )
+        self.accounts_info.pack(anchor='w', padx=5, pady=5)
+        
+        self.accounts_list = tk.Listbox(accounts_frame, height=5)
+        self.accounts_list.pack(side='left', fill='both', expand=True, padx=5, pady=5)
+        self.accounts_list.bind('<<ListboxSelect>>', self.show_account)
+        
+        ttk.Button(accounts_frame, text="Quitar", command=self.remove_account).pack(side='left', padx=5)
     
     def create_data_tab(self):
         """Crea la pestaña para importar datos de Excel"""
         tab = ttk.Frame(self.notebook)
         self.notebook.add(tab, text="Datos de Clientes")
         
-        frame = ttk.LabelFrame(tab, text="Importar Datos desde Excel")
+        frame = ttk.LabelFrame(tab, text="Importar Datos desde Excel, CSV o Parquet")
         frame.pack(pady=10, padx=10, fill='both', expand=True)
         
         # Botón para seleccionar archivo
-        ttk.Button(frame, text="Seleccionar Archivo Excel", command=self.load_excel_file).pack(pady=10)
+        ttk.Button(frame, text="Seleccionar Archivo", command=self.load_excel_file).pack(pady=10)
         
-        # Vista previa de datos
-        self.data_preview = ttk.Treeview(frame)
-        self.data_preview.pack(fill='both', expand=True, pady=5)
+        # Búsqueda sobre todos los registros
+        search_frame = ttk.Frame(frame)
+        search_frame.pack(fill='x', padx=5)
+        ttk.Label(search_frame, text="Buscar:").pack(side='left', padx=5)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        search_entry.pack(side='left', fill='x', expand=True, padx=5)
+        search_entry.bind('<Return>', lambda event: self.search_data())
+        ttk.Button(search_frame, text="Buscar", command=self.search_data).pack(side='left', padx=5)
         
-        # Barra de desplazamiento
-        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self.data_preview.yview)
-        scrollbar.pack(side='right', fill='y')
-        self.data_preview.configure(yscrollcommand=scrollbar.set)
+        # Vista previa de datos (muestra todos los registros; haz clic en
+        # un encabezado para ordenar)
+        self.data_preview = VirtualTreeview(frame)
+        self.data_preview.pack(fill='both', expand=True, pady=5)
         
         # Etiqueta de información
         self.data_info = ttk.Label(frame, text="No se ha cargado ningún archivo")
@@ -136,6 +254,20 @@ class EmailSenderApp:
         # Editor de texto
         self.message_editor = scrolledtext.ScrolledText(frame, wrap=tk.WORD, height=15)
         self.message_editor.pack(fill='both', expand=True, padx=5, pady=5)
+        # La vista previa se actualiza sola al dejar de escribir
+        self.message_editor.bind('<<Modified>>', self.on_message_modified)
+        
+        # Adjuntos (se codifican una sola vez y se comparten entre todos los correos)
+        attach_frame = ttk.LabelFrame(frame, text="Adjuntos")
+        attach_frame.pack(fill='x', padx=5, pady=5)
+        
+        self.attachments_list = tk.Listbox(attach_frame, height=3)
+        self.attachments_list.pack(side='left', fill='x', expand=True, padx=5, pady=5)
+        
+        attach_buttons = ttk.Frame(attach_frame)
+        attach_buttons.pack(side='left', padx=5)
+        ttk.Button(attach_buttons, text="Agregar...", command=self.add_attachment).pack(fill='x', pady=2)
+        ttk.Button(attach_buttons, text="Quitar", command=self.remove_attachment).pack(fill='x', pady=2)
         
         # Botón de previsualización
         ttk.Button(frame, text="Previsualizar Mensaje", command=self.preview_message).pack(pady=5)
@@ -144,9 +276,35 @@ class EmailSenderApp:
         preview_frame = ttk.LabelFrame(tab, text="Previsualización del Mensaje")
         preview_frame.pack(pady=10, padx=10, fill='both', expand=True)
         
+        # Navegación entre filas de la vista previa
+        preview_nav = ttk.Frame(preview_frame)
+        preview_nav.pack(fill='x', padx=5, pady=2)
+        ttk.Button(preview_nav, text="◀ Anterior", command=lambda: self.step_preview(-1)).pack(side='left')
+        ttk.Button(preview_nav, text="Siguiente ▶", command=lambda: self.step_preview(1)).pack(side='left', padx=5)
+        ttk.Button(preview_nav, text="Fila más larga", command=self.show_longest_row).pack(side='left')
+        self.preview_row_label = ttk.Label(preview_nav, text="Sin datos cargados")
+        self.preview_row_label.pack(side='left', padx=10)
+        self.preview_status = ttk.Label(preview_nav, text="", foreground='red')
+        self.preview_status.pack(side='left')
+        
         self.preview_text = scrolledtext.ScrolledText(preview_frame, wrap=tk.WORD, height=10, state='disabled')
         self.preview_text.pack(fill='both', expand=True, padx=5, pady=5)
     
+    def add_attachment(self):
+        """Agrega archivos a la lista de adjuntos"""
+        for path in filedialog.askopenfilenames(title="Seleccionar adjuntos"):
+            if path not in self.attachments:
+                self.attachments.append(path)
+                size = os.path.getsize(path) / 1024
+                self.attachments_list.insert(tk.END, f"{os.path.basename(path)} ({size:.0f} KB)")
+    
+    def remove_attachment(self):
+        """Quita el adjunto seleccionado y libera su copia codificada"""
+        from attachments import forget_attachment
+        for index in reversed(self.attachments_list.curselection()):
+            self.attachments_list.delete(index)
+            forget_attachment(self.attachments.pop(index))
+    
     def create_send_tab(self):
         """Crea la pestaña para enviar los correos"""
         tab = ttk.Frame(self.notebook)
@@ -164,12 +322,69 @@ class EmailSenderApp:
         self.counter_label = ttk.Label(frame, text="0/0 correos enviados")
         self.counter_label.pack(pady=5)
         
+        # Resultado de la validación de destinatarios
+        self.validation_label = ttk.Label(frame, text="Destinatarios sin validar")
+        self.validation_label.pack(pady=5)
+        
+        # Panel de rendimiento: velocidad, tiempo restante y tiempo por etapa
+        dashboard = ttk.LabelFrame(frame, text="Rendimiento")
+        dashboard.pack(fill='x', padx=5, pady=5)
+        
+        self.speed_label = ttk.Label(dashboard, text="Velocidad: -")
+        self.speed_label.grid(row=0, column=0, sticky='w', padx=5)
+        self.retries_label = ttk.Label(dashboard, text="Reintentos: 0")
+        self.retries_label.grid(row=1, column=0, sticky='w', padx=5)
+        self.senders_label = ttk.Label(dashboard, text="", wraplength=420)
+        self.senders_label.grid(row=2, column=0, sticky='nw', padx=5)
+        
+        self.stages_tree = ttk.Treeview(
+            dashboard, columns=('tiempo', 'porcentaje', 'media'), height=len(STAGES)
+        )
+        self.stages_tree.heading('#0', text="Etapa")
+        self.stages_tree.heading('tiempo', text="Tiempo")
+        self.stages_tree.heading('porcentaje', text="%")
+        self.stages_tree.heading('media', text="Media")
+        self.stages_tree.column('#0', width=170)
+        for column in ('tiempo', 'porcentaje', 'media'):
+            self.stages_tree.column(column, width=80, anchor='e')
+        for stage, label in STAGES.items():
+            self.stages_tree.insert('', 'end', iid=stage, text=label, values=('-', '-', '-'))
+        self.stages_tree.grid(row=0, column=1, rowspan=3, sticky='e', padx=5, pady=5)
+        dashboard.columnconfigure(0, weight=1)
+        
         # Log de envío
-        self.log_text = scrolledtext.ScrolledText(frame, height=15, state='disabled')
+        self.log_text = scrolledtext.ScrolledText(frame, height=8, state='disabled')
         self.log_text.pack(fill='both', expand=True, padx=5, pady=5)
         
-        # Botón de envío
-        ttk.Button(frame, text="Iniciar Envío", command=self.start_sending).pack(pady=10)
+        # Reanudar una campaña interrumpida
+        self.resume_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            frame, text="Reanudar envío (omitir los correos ya enviados)", variable=self.resume_var
+        ).pack(pady=5)
+        
+        # Botones de control del envío
+        buttons = ttk.Frame(frame)
+        buttons.pack(pady=10)
+        
+        self.validate_button = ttk.Button(buttons, text="Validar Destinatarios", command=self.check_recipients)
+        self.validate_button.pack(side='left', padx=5)
+        
+        self.start_button = ttk.Button(buttons, text="Iniciar Envío", command=self.start_sending)
+        self.start_button.pack(side='left', padx=5)
+        
+        self.pause_button = ttk.Button(buttons, text="Pausar", command=self.toggle_pause, state='disabled')
+        self.pause_button.pack(side='left', padx=5)
+        
+        self.cancel_button = ttk.Button(buttons, text="Cancelar", command=self.cancel_sending, state='disabled')
+        self.cancel_button.pack(side='left', padx=5)
+        
+        # Campaña para el envío desatendido (automatizador_cli.py)
+        ttk.Button(buttons, text="Guardar Campaña...", command=self.save_campaign_file).pack(side='left', padx=5)
+        
+        self.export_metrics_button = ttk.Button(
+            buttons, text="Exportar Métricas...", command=self.export_metrics, state='disabled'
+        )
+        self.export_metrics_button.pack(side='left', padx=5)
     
     def create_mapping_tab(self):
         """Crea la pestaña para mapeo de columnas"""
@@ -234,111 +449,269 @@ class EmailSenderApp:
         elif provider == "Office365":
             self.server_entry.insert(0, "smtp.office365.com")
             self.port_entry.insert(0, "587")
+        
+        # Muestra los límites que se respetarán durante el envío
+        limits = provider_limits(provider)
+        if limits:
+            self.limits_label.config(
+                text=f"Límites de envío: {limits['por_minuto']}/minuto, {limits['por_dia']}/día"
+            )
+        else:
+            self.limits_label.config(text="Límites de envío: sin límite conocido")
+    
+    def read_smtp_form(self):
+        """Lee la configuración SMTP del formulario; lanza ValueError si está incompleta"""
+        config = {
+            'servidor': self.server_entry.get(),
+            'puerto': int(self.port_entry.get()),
+            'email': self.email_entry.get(),
+            'password': self.password_entry.get(),
+            'conexiones': int(self.pool_size_var.get())
+        }
+        
+        # Validación básica
+        if not all(config.values()):
+            raise ValueError("Todos los campos son requeridos")
+        if config['conexiones'] < 1:
+            raise ValueError("Se necesita al menos una conexión")
+        
+        # El proveedor es opcional: solo determina los límites de envío
+        config['proveedor'] = self.provider_var.get()
+        
+        daily_limit = self.daily_limit_entry.get().strip()
+        if daily_limit:
+            config['por_dia'] = int(daily_limit)
+            if config['por_dia'] < 1:
+                raise ValueError("El límite diario debe ser mayor que cero")
+        return config
     
     def test_connection(self):
-        """Prueba la conexión con el servidor SMTP"""
+        """Prueba la conexión con el servidor SMTP; devuelve True si funcionó"""
         try:
             # Obtiene la configuración desde la interfaz
-            self.smtp_config = {
-                'servidor': self.server_entry.get(),
-                'puerto': int(self.port_entry.get()),
-                'email': self.email_entry.get(),
-                'password': self.password_entry.get()
-            }
-            
-            # Validación básica
-            if not all(self.smtp_config.values()):
-                raise ValueError("Todos los campos son requeridos")
+            self.smtp_config = self.read_smtp_form()
             
             # Intenta la conexión
-            if self.smtp_config['puerto'] == 465:
-                server = smtplib.SMTP_SSL(self.smtp_config['servidor'], self.smtp_config['puerto'])
-            else:
-                server = smtplib.SMTP(self.smtp_config['servidor'], self.smtp_config['puerto'])
-                server.starttls()
-            
-            server.login(self.smtp_config['email'], self.smtp_config['password'])
+            from send_engine import open_smtp_connection
+            server = open_smtp_connection(self.smtp_config)
             server.quit()
             
             messagebox.showinfo("Éxito", "Conexión exitosa con el servidor SMTP")
+            return True
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo conectar: {str(e)}")
+            return False
+    
+    def add_account(self):
+        """Prueba la cuenta del formulario y la agrega a las cuentas de envío"""
+        if not self.test_connection():
+            return
+        
+        # La misma dirección reemplaza a la cuenta anterior
+        config = dict(self.smtp_config)
+        emails = [account['email'] for account in self.sender_accounts]
+        if config['email'] in emails:
+            index = emails.index(config['email'])
+            self.sender_accounts[index] = config
+            self.accounts_list.delete(index)
+        else:
+            index = len(self.sender_accounts)
+            self.sender_accounts.append(config)
+        self.accounts_list.insert(index, account_label(config))
+        self.update_accounts_info()
+    
+    def remove_account(self):
+        """Quita la cuenta seleccionada"""
+        for index in reversed(self.accounts_list.curselection()):
+            self.accounts_list.delete(index)
+            del self.sender_accounts[index]
+        self.update_accounts_info()
+    
+    def show_account(self, event):
+        """Carga en el formulario la cuenta seleccionada, para revisarla o editarla"""
+        selection = self.accounts_list.curselection()
+        if not selection:
+            return
+        
+        config = self.sender_accounts[selection[0]]
+        self.provider_var.set(config.get('proveedor', ''))
+        for entry, value in ((self.server_entry, config['servidor']),
+                             (self.port_entry, config['puerto']),
+                             (self.email_entry, config['email']),
+                             (self.password_entry, config['password']),
+                             (self.daily_limit_entry, config.get('por_dia', ''))):
+            entry.delete(0, tk.END)
+            entry.insert(0, str(value))
+        self.pool_size_var.set(str(config['conexiones']))
+    
+    def update_accounts_info(self):
+        """Resume cuántas cuentas participan en el envío"""
+        if not self.sender_accounts:
+            text = "Sin cuentas agregadas: se usará la cuenta configurada arriba"
+        else:
+            connections = sum(account['conexiones'] for account in self.sender_accounts)
+            text = (f"El envío se repartirá entre {len(self.sender_accounts)} cuenta(s) "
+                    f"con {connections} conexiones en total")
+        self.accounts_info.config(text=text)
+    
+    def campaign_accounts(self):
+        """Cuentas con las que se enviará: las agregadas o, si no hay, la configurada"""
+        if self.sender_accounts:
+            return [dict(account) for account in self.sender_accounts]
+        if all([self.smtp_config['servidor'], self.smtp_config['email'], self.smtp_config['password']]):
+            return [dict(self.smtp_config)]
+        return []
     
     def load_excel_file(self):
-        """Carga un archivo Excel con los datos de los clientes"""
-        filepath = filedialog.askopenfilename(
-            filetypes=[("Excel files", "*.xlsx *.xls")]
-        )
+        """Carga un archivo con los datos de los clientes (Excel, CSV o Parquet)"""
+        if self.loader_events is not None:
+            return  # Ya hay una carga en curso
+        from data_loader import FILETYPES
+        
+        filepath = filedialog.askopenfilename(filetypes=FILETYPES)
         
         if filepath:
-            try:
-                # Lee el archivo Excel
-                self.df_clientes = pd.read_excel(filepath)
-                self.current_excel_path = filepath
-                
-                # Actualiza la vista previa
-                self.update_data_preview()
-                
-                # Muestra las columnas disponibles para mapeo
-                available_cols = ", ".join(self.df_clientes.columns)
-                self.available_cols_label.config(
-                    text=f"Columnas disponibles: {available_cols}"
-                )
+            # La lectura se hace en segundo plano para no congelar la ventana
+            self.df_clientes = None
+            self.current_excel_path = filepath
+            self.loaded_chunks = []
+            self.loader_events = queue.Queue()
+            self.data_info.config(text=f"Cargando {os.path.basename(filepath)}...")
+            threading.Thread(
+                target=self.read_file_chunks, args=(filepath, self.loader_events), daemon=True
+            ).start()
+            self.root.after(100, self.poll_loader_events)
+    
+    def read_file_chunks(self, filepath, events):
+        """Lee el archivo por bloques (se ejecuta en un hilo aparte)"""
+        import pandas as pd
+        import contacts_cache
+        from data_loader import iter_chunks, read_columns
+        
+        start = time.perf_counter()
+        try:
+            # Si el mismo contenido ya se leyó antes, se recupera de la caché
+            df = contacts_cache.load(filepath)
+            if df is None:
+                chunks = []
+                for chunk in iter_chunks(filepath):
+                    chunks.append(chunk)
+                    events.put(('bloque', chunk))
                 
-                messagebox.showinfo(
-                    "Éxito", 
-                    f"Archivo cargado: {os.path.basename(filepath)}\n"
-                    f"{len(self.df_clientes)} registros encontrados"
-                )
+                if chunks:
+                    df = pd.concat(chunks, ignore_index=True)
+                else:
+                    df = pd.DataFrame(columns=read_columns(filepath))
+                contacts_cache.store(filepath, df)
             
-            except Exception as e:
-                messagebox.showerror("Error", f"No se pudo cargar el archivo: {str(e)}")
-                self.df_clientes = None
-                self.current_excel_path = ""
-    
-    def update_data_preview(self):
-        """Actualiza la vista previa de los datos del Excel"""
-        # Limpia la vista previa
-        self.data_preview.delete(*self.data_preview.get_children())
-        
-        if self.df_clientes is not None:
-            # Configura las columnas
-            columns = list(self.df_clientes.columns)
-            self.data_preview['columns'] = columns
-            
-            # Configura los encabezados
-            for col in columns:
-                self.data_preview.heading(col, text=col)
-                self.data_preview.column(col, width=100, minwidth=50, anchor='w')
-            
-            # Agrega los datos (solo las primeras 10 filas)
-            for _, row in self.df_clientes.head(10).iterrows():
-                self.data_preview.insert("", tk.END, values=list(row))
+            events.put(('fin', (df, time.perf_counter() - start)))
+        except Exception as e:
+            events.put(('error', str(e)))
+    
+    def poll_loader_events(self):
+        """Incorpora los bloques leídos y muestra el avance de la carga"""
+        finished = None
+        while True:
+            try:
+                kind, data = self.loader_events.get_nowait()
+            except queue.Empty:
+                break
             
-            # Actualiza la información
+            if kind == 'bloque':
+                self.loaded_chunks.append(data)
+                # Muestra la vista previa en cuanto llega el primer bloque
+                if len(self.loaded_chunks) == 1:
+                    self.update_data_preview(data)
+            else:
+                finished = (kind, data)
+        
+        if finished is None:
+            loaded_rows = sum(len(chunk) for chunk in self.loaded_chunks)
             self.data_info.config(
-                text=f"Archivo: {os.path.basename(self.current_excel_path)}\n"
-                     f"Registros: {len(self.df_clientes)} | Columnas: {len(self.df_clientes.columns)}"
+                text=f"Cargando {os.path.basename(self.current_excel_path)}... "
+                     f"{loaded_rows} registros leídos"
             )
+            self.root.after(100, self.poll_loader_events)
+            return
+        
+        self.loader_events = None
+        kind, data = finished
+        if kind == 'error':
+            messagebox.showerror("Error", f"No se pudo cargar el archivo: {data}")
+            self.df_clientes = None
+            self.current_excel_path = ""
+            self.loaded_chunks = []
+            self.update_data_preview()
+            self.reset_preview()
+            return
+        
+        self.df_clientes, self.load_seconds = data
+        self.loaded_chunks = []
+        
+        # Actualiza la vista previa
+        self.update_data_preview()
+        self.reset_preview()
+        
+        # Muestra las columnas disponibles para mapeo
+        available_cols = ", ".join(map(str, self.df_clientes.columns))
+        self.available_cols_label.config(
+            text=f"Columnas disponibles: {available_cols}"
+        )
+        
+        messagebox.showinfo(
+            "Éxito", 
+            f"Archivo cargado: {os.path.basename(self.current_excel_path)}\n"
+            f"{len(self.df_clientes)} registros encontrados"
+        )
+    
+    def update_data_preview(self, df=None):
+        """Actualiza la vista previa de los datos del Excel.
+        
+        Durante la carga recibe el primer bloque leído en ``df``.
+        """
+        loading = df is not None
+        if df is None:
+            df = self.df_clientes
+        
+        self.search_var.set("")
+        self.data_preview.set_dataframe(df)
+        
+        if df is not None:
+            # Actualiza la información
+            if not loading:
+                self.update_data_info()
         else:
             self.data_info.config(text="No se ha cargado ningún archivo")
     
+    def update_data_info(self):
+        """Muestra el resumen del archivo cargado y de la búsqueda vigente"""
+        text = (f"Archivo: {os.path.basename(self.current_excel_path)}\n"
+                f"Registros: {len(self.df_clientes)} | Columnas: {len(self.df_clientes.columns)}")
+        if self.data_preview.row_count != len(self.df_clientes):
+            text += f" | Coincidencias: {self.data_preview.row_count}"
+        self.data_info.config(text=text)
+    
+    def search_data(self):
+        """Filtra la vista previa con el texto de búsqueda"""
+        if self.df_clientes is None:
+            return
+        self.data_preview.search(self.search_var.get())
+        self.update_data_info()
+    
     def validate_excel_structure(self):
         """Verifica que el Excel tenga las columnas necesarias según el mapeo"""
         if self.df_clientes is None:
             return False
         
         # Verifica que las columnas mapeadas existan en el DataFrame
-        missing_columns = [
-            col for col in self.column_mapping.values() 
-            if col not in self.df_clientes.columns
-        ]
+        from campaign import missing_columns
+        missing = missing_columns(self.df_clientes.columns, self.column_mapping)
         
-        if missing_columns:
+        if missing:
             messagebox.showerror(
                 "Error", 
                 f"El archivo Excel no tiene las columnas requeridas.\n"
-                f"Columnas faltantes: {', '.join(missing_columns)}\n"
+                f"Columnas faltantes: {', '.join(map(str, missing))}\n"
                 f"Por favor, configura el mapeo correctamente."
             )
             return False
@@ -356,28 +729,152 @@ class EmailSenderApp:
             return
         
         try:
-            # Toma la primera fila como ejemplo
-            sample_row = self.df_clientes.iloc[0]
-            preview = message_text
-            
-            # Reemplaza todos los marcadores {columna} con valores reales
-            for col in self.df_clientes.columns:
-                if pd.notna(sample_row[col]):
-                    preview = preview.replace(f"{{{col}}}", str(sample_row[col]))
-            
-            # Muestra la previsualización
-            self.preview_text.config(state='normal')
-            self.preview_text.delete('1.0', tk.END)
-            self.preview_text.insert(tk.END, preview)
-            self.preview_text.config(state='disabled')
+            # Comprueba que todos los marcadores tengan columna
+            from template_engine import compile_template
+            compile_template(message_text, self.df_clientes.columns)
+            self.refresh_preview()
         
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo generar la previsualización: {str(e)}")
     
+    def on_message_modified(self, event):
+        """Programa la actualización de la vista previa cuando se deja de escribir"""
+        if not self.message_editor.edit_modified():
+            return
+        self.message_editor.edit_modified(False)
+        
+        if self.preview_job is not None:
+            self.root.after_cancel(self.preview_job)
+        self.preview_job = self.root.after(PREVIEW_DELAY_MS, self.refresh_preview)
+    
+    def reset_preview(self):
+        """Prepara la vista previa para los datos recién cargados"""
+        if self.df_clientes is None or self.df_clientes.empty:
+            self.preview_renderer = None
+        else:
+            from live_preview import PreviewRenderer
+            self.preview_renderer = PreviewRenderer(self.df_clientes)
+        self.preview_row = 0
+        self.refresh_preview()
+    
+    def refresh_preview(self):
+        """Personaliza la vista previa con la fila actual (textos en caché)"""
+        self.preview_job = None
+        if self.preview_renderer is None:
+            self.preview_row_label.config(text="Sin datos cargados")
+            self.preview_status.config(text="")
+            self.show_preview("")
+            return
+        
+        message_text = self.message_editor.get("1.0", tk.END).strip()
+        unknown = self.preview_renderer.unknown_fields(message_text)
+        self.preview_status.config(
+            text=f"Sin columna: {', '.join(f'{{{name}}}' for name in unknown)}" if unknown else ""
+        )
+        self.preview_row_label.config(
+            text=f"Fila {self.preview_row + 1} de {self.preview_renderer.row_count}"
+        )
+        self.show_preview(self.preview_renderer.render(message_text, self.preview_row))
+    
+    def show_preview(self, text):
+        """Actualiza el widget de vista previa reemplazando solo el tramo que cambió"""
+        if text == self.preview_shown:
+            return
+        from live_preview import changed_span, needs_full_redraw
+        
+        self.preview_text.config(state='normal')
+        if needs_full_redraw(text, self.preview_shown):
+            self.preview_text.delete('1.0', tk.END)
+            self.preview_text.insert(tk.END, text)
+        else:
+            start, end, replacement = changed_span(self.preview_shown, text)
+            self.preview_text.delete(f"1.0 + {start} chars", f"1.0 + {end} chars")
+            self.preview_text.insert(f"1.0 + {start} chars", replacement)
+        self.preview_text.config(state='disabled')
+        self.preview_shown = text
+    
+    def step_preview(self, delta):
+        """Muestra la fila anterior o siguiente"""
+        if self.preview_renderer is None:
+            return
+        
+        last = self.preview_renderer.row_count - 1
+        self.preview_row = min(max(self.preview_row + delta, 0), last)
+        self.refresh_preview()
+    
+    def show_longest_row(self):
+        """Salta a la fila cuyo mensaje resulta más largo, para revisar el formato"""
+        if self.preview_renderer is None:
+            return
+        
+        message_text = self.message_editor.get("1.0", tk.END).strip()
+        self.preview_row = self.preview_renderer.longest_row(message_text)
+        self.refresh_preview()
+    
+    def check_recipients(self):
+        """Valida y depura los destinatarios; devuelve el informe o None"""
+        if not self.validate_excel_structure():
+            return None
+        from campaign import prepare_recipients
+        
+        try:
+            _, report = prepare_recipients(
+                self.df_clientes, self.column_mapping, self.message_editor.get("1.0", tk.END).strip()
+            )
+        except ValueError as e:
+            # CampaignError, TemplateError o datos que pandas no puede validar
+            messagebox.showerror("Error", str(e))
+            return None
+        
+        # Muestra el informe en la pestaña de envío
+        self.validation_label.config(
+            text=f"Destinatarios válidos: {len(report.clean)} de {report.total} "
+                 f"({report.discarded} descartados)"
+        )
+        self.log_message("=== VALIDACIÓN DE DESTINATARIOS ===")
+        for line in report.summary():
+            self.log_message(line)
+        return report
+    
+    def save_campaign_file(self):
+        """Guarda la configuración actual como campaña para el modo sin ventana"""
+        accounts = self.campaign_accounts()
+        if not accounts:
+            messagebox.showerror("Error", "Configura primero la conexión SMTP")
+            return
+        
+        if not self.validate_excel_structure():
+            return
+        
+        message_text = self.message_editor.get("1.0", tk.END).strip()
+        if not message_text:
+            messagebox.showerror("Error", "Escribe un mensaje en el editor")
+            return
+        
+        path = filedialog.asksaveasfilename(
+            defaultextension=".json", filetypes=[("Campaña", "*.json")]
+        )
+        if not path:
+            return
+        
+        include_password = messagebox.askyesno(
+            "Contraseña",
+            "¿Guardar también la contraseña en el archivo?\n"
+            "Si no, el envío sin ventana la tomará de la variable SMTP_PASSWORD."
+        )
+        from campaign import save_campaign
+        try:
+            save_campaign(path, accounts, self.column_mapping, message_text,
+                          self.current_excel_path, self.attachments, include_password)
+            messagebox.showinfo("Éxito", f"Campaña guardada en {os.path.basename(path)}")
+        except OSError as e:
+            messagebox.showerror("Error", f"No se pudo guardar la campaña: {str(e)}")
+    
     def start_sending(self):
         """Inicia el proceso de envío de correos"""
         # Validaciones previas
-        if not all([self.smtp_config['servidor'], self.smtp_config['email'], self.smtp_config['password']]):
+        accounts = self.campaign_accounts()
+        if not accounts:
             messagebox.showerror("Error", "Configura primero la conexión SMTP")
             return
         
@@ -388,110 +885,262 @@ class EmailSenderApp:
         if not message_text:
             messagebox.showerror("Error", "Escribe un mensaje en el editor")
             return
+        from campaign import create_engine, open_journal
+        from template_engine import TemplateError, compile_template
+        
+        try:
+            template = compile_template(message_text, self.df_clientes.columns)
+        except TemplateError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        # Solo las filas limpias llegan al servidor
+        validation_start = time.perf_counter()
+        report = self.check_recipients()
+        validation_seconds = time.perf_counter() - validation_start
+        if report is None:
+            return
+        recipients = report.clean
+        if recipients.empty:
+            messagebox.showerror("Error", "No hay destinatarios válidos para enviar")
+            return
+        
+        # Registro de la campaña, para poder reanudarla si se interrumpe
+        try:
+            journal = open_journal(self.current_excel_path, message_text)
+            delivered = len(journal.delivered_rows())
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo abrir el registro de la campaña: {str(e)}")
+            return
+        
+        resume = self.resume_var.get()
+        if resume:
+            question = (f"¿Reanudar el envío?\n"
+                        f"Se omitirán {delivered} de {len(recipients)} correos ya enviados.")
+        else:
+            question = (f"¿Estás seguro de enviar {len(recipients)} correos?\n"
+                        "Esta operación puede tardar varios minutos.")
+            if report.discarded:
+                question += f"\n({report.discarded} destinatarios descartados en la validación)"
+            if len(accounts) > 1:
+                question += f"\nEl envío se repartirá entre {len(accounts)} cuentas."
+            if delivered:
+                question += (f"\n\nAtención: {delivered} clientes ya recibieron este mensaje. "
+                             "Marca 'Reanudar envío' para omitirlos.")
         
         # Confirmación del usuario
-        if not messagebox.askyesno(
-            "Confirmar", 
-            f"¿Estás seguro de enviar {len(self.df_clientes)} correos?\n"
-            "Esta operación puede tardar varios minutos."
-        ):
+        if not messagebox.askyesno("Confirmar", question):
+            journal.close()
             return
         
         # Deshabilita las pestañas durante el envío
         for i in range(self.notebook.index("end")):
             self.notebook.tab(i, state='disabled')
         
-        # Inicia el envío
-        self.root.after(100, lambda: self.send_emails(message_text))
+        # Métricas del envío; la lectura y la validación ya se hicieron
+        metrics = SendMetrics()
+        metrics.add('carga', self.load_seconds)
+        metrics.add('validacion', validation_seconds)
+        
+        # Inicia el envío en segundo plano
+        self.engine = create_engine(accounts, recipients, self.column_mapping, template,
+                                    journal, resume=resume, attachments=self.attachments,
+                                    metrics=metrics)
+        self.engine.start()
+        
+        self.start_button.config(state='disabled')
+        self.validate_button.config(state='disabled')
+        self.pause_button.config(state='normal', text="Pausar")
+        self.cancel_button.config(state='normal')
+        self.export_metrics_button.config(state='disabled')
+        self.root.after(100, self.poll_engine_events)
+        self.refresh_metrics()
     
-    def send_emails(self, message_text):
-        """Realiza el envío masivo de correos"""
-        total_emails = len(self.df_clientes)
-        success_count = 0
-        failure_count = 0
+    def poll_engine_events(self):
+        """Procesa los eventos pendientes del motor de envío"""
+        progress = None
+        finished = None
         
-        self.log_message("=== INICIANDO ENVÍO DE CORREOS ===")
+        while True:
+            try:
+                kind, data = self.engine.events.get_nowait()
+            except queue.Empty:
+                break
+            
+            if kind == 'log':
+                self.log_message(data)
+            elif kind == 'progreso':
+                progress = data  # Solo interesa el último avance
+            elif kind == 'estado':
+                self.log_message(f"--- Envío {data} ---")
+            elif kind in ('fin', 'error'):
+                finished = (kind, data)
         
-        try:
-            # Conexión SMTP
-            if self.smtp_config['puerto'] == 465:
-                server = smtplib.SMTP_SSL(self.smtp_config['servidor'], self.smtp_config['puerto'])
+        # Actualiza el progreso una sola vez por ciclo
+        if progress is not None:
+            sent, total_emails = progress
+            if total_emails:
+                self.progress_var.set(sent / total_emails * 100)
+                self.counter_label.config(text=f"{sent}/{total_emails} correos enviados")
             else:
-                server = smtplib.SMTP(self.smtp_config['servidor'], self.smtp_config['puerto'])
-                server.starttls()
-            
-            # Autenticación
-            server.login(self.smtp_config['email'], self.smtp_config['password'])
-            
-            # Procesa cada cliente
-            for i, (_, row) in enumerate(self.df_clientes.iterrows()):
-                try:
-                    # Personaliza el mensaje
-                    email = row[self.column_mapping['email']]
-                    personalized_msg = message_text
-                    
-                    # Reemplaza todos los marcadores
-                    for col in self.df_clientes.columns:
-                        if pd.notna(row[col]):
-                            personalized_msg = personalized_msg.replace(f"{{{col}}}", str(row[col]))
-                    
-                    # Prepara el correo
-                    msg = MIMEMultipart()
-                    msg['From'] = self.smtp_config['email']
-                    msg['To'] = email
-                    msg['Subject'] = "Mensaje personalizado"
-                    
-                    msg.attach(MIMEText(personalized_msg, 'plain'))
-                    
-                    # Envía el correo
-                    server.send_message(msg)
-                    success_count += 1
-                    self.log_message(f"✓ Enviado a {email}")
-                
-                except Exception as e:
-                    failure_count += 1
-                    self.log_message(f"✗ Error con {email}: {str(e)}")
-                
-                # Actualiza el progreso
-                progress = (i + 1) / total_emails * 100
-                self.progress_var.set(progress)
-                self.counter_label.config(text=f"{i+1}/{total_emails} correos enviados")
-                self.root.update()
-            
-            # Cierra la conexión
-            server.quit()
-            
-            # Resultado final
-            self.log_message(f"=== ENVÍO COMPLETADO ===")
-            self.log_message(f"Correctos: {success_count}, Fallidos: {failure_count}")
+                # Aún se están leyendo filas: el total no se conoce
+                self.counter_label.config(text=f"{sent} correos enviados")
+        
+        if finished is None:
+            self.root.after(100, self.poll_engine_events)
+        else:
+            self.finish_sending(*finished)
+    
+    def finish_sending(self, kind, data):
+        """Muestra el resultado del envío y restaura la interfaz"""
+        if kind == 'fin':
+            success_count, failure_count, cancelled = data
             messagebox.showinfo(
-                "Completado", 
-                f"Proceso terminado:\n"
+                "Cancelado" if cancelled else "Completado", 
+                f"Proceso {'cancelado' if cancelled else 'terminado'}:\n"
                 f"- Correos enviados: {success_count}\n"
                 f"- Errores: {failure_count}"
             )
+        else:
+            messagebox.showerror("Error", f"Error en el envío: {data}")
         
-        except Exception as e:
-            self.log_message(f"ERROR GLOBAL: {str(e)}")
-            messagebox.showerror("Error", f"Error en el envío: {str(e)}")
+        # Resultado final del panel de rendimiento, disponible para exportar
+        self.last_metrics = self.engine.metrics
+        self.update_metrics_view(self.last_metrics.snapshot(), finished=True)
+        self.export_metrics_button.config(state='normal')
         
-        finally:
-            # Rehabilita las pestañas
-            for i in range(self.notebook.index("end")):
-                self.notebook.tab(i, state='normal')
-            
-            # Reinicia el progreso
-            self.progress_var.set(0)
+        from campaign import close_engine
+        close_engine(self.engine)
+        if self.engine.audit_log is not None:
+            self.log_message(f"Registro completo en: {self.engine.audit_log.path}")
+        self.engine = None
+        
+        # Rehabilita las pestañas
+        for i in range(self.notebook.index("end")):
+            self.notebook.tab(i, state='normal')
+        
+        self.start_button.config(state='normal')
+        self.validate_button.config(state='normal')
+        self.pause_button.config(state='disabled', text="Pausar")
+        self.cancel_button.config(state='disabled')
+        
+        # Reinicia el progreso
+        self.progress_var.set(0)
+    
+    def refresh_metrics(self):
+        """Actualiza periódicamente el panel de rendimiento mientras se envía"""
+        if self.engine is None:
+            return
+        
+        self.update_metrics_view(self.engine.metrics.snapshot())
+        self.root.after(METRICS_REFRESH_MS, self.refresh_metrics)
+    
+    def update_metrics_view(self, stats, finished=False):
+        """Muestra velocidad, tiempo restante, reintentos y tiempo por etapa"""
+        speed = f"Velocidad: {stats['por_minuto']:.0f} correos/min"
+        if finished:
+            speed += f"  ·  Duración: {format_duration(stats['segundos'])}"
+        elif stats['eta_segundos'] is not None:
+            speed += f"  ·  Tiempo restante: {format_duration(stats['eta_segundos'])}"
+        else:
+            speed += "  ·  Tiempo restante: calculando..."
+        self.speed_label.config(text=speed)
+        
+        self.retries_label.config(
+            text=f"Reintentos: {stats['reintentos']} "
+                 f"(reconexiones {stats['reconexiones']}, aplazados {stats['aplazados']})"
+        )
+        
+        # Correos enviados por cada cuenta, si hay más de una
+        senders = stats['cuentas']
+        if len(senders) > 1:
+            self.senders_label.config(
+                text="Por cuenta: " + "  ·  ".join(f"{email} {sent}" for email, sent in senders.items())
+            )
+        else:
+            self.senders_label.config(text="")
+        
+        for stage, values in stats['etapas'].items():
+            average = values['media_ms']
+            self.stages_tree.item(stage, values=(
+                f"{values['segundos']:.1f} s",
+                f"{values['porcentaje']:.0f} %",
+                f"{average:.2f} ms" if average is not None else '-',
+            ))
+    
+    def export_metrics(self):
+        """Guarda en JSON las métricas del último envío"""
+        if self.last_metrics is None:
+            return
+        
+        path = filedialog.asksaveasfilename(
+            defaultextension=".json", filetypes=[("Métricas", "*.json")]
+        )
+        if not path:
+            return
+        
+        try:
+            self.last_metrics.to_json(path)
+            messagebox.showinfo("Éxito", f"Métricas guardadas en {os.path.basename(path)}")
+        except OSError as e:
+            messagebox.showerror("Error", f"No se pudieron guardar las métricas: {str(e)}")
+    
+    def toggle_pause(self):
+        """Pausa o reanuda el envío en curso"""
+        if self.engine is None:
+            return
+        
+        if self.engine.paused:
+            self.engine.resume()
+            self.pause_button.config(text="Pausar")
+        else:
+            self.engine.pause()
+            self.pause_button.config(text="Reanudar")
+    
+    def cancel_sending(self):
+        """Cancela el envío en curso"""
+        if self.engine is None:
+            return
+        
+        if messagebox.askyesno("Confirmar", "¿Cancelar el envío en curso?"):
+            self.engine.cancel()
+            self.pause_button.config(state='disabled')
+            self.cancel_button.config(state='disabled')
     
     def log_message(self, message):
-        """Agrega un mensaje al registro de eventos"""
-        self.log_text.config(state='normal')
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
-        self.log_text.config(state='disabled')
-        self.root.update()
+        """Agrega un mensaje al registro de eventos (se muestra en el próximo volcado)"""
+        self.log_buffer.append(message)
+    
+    def flush_log(self):
+        """Vuelca al widget, de una sola vez, los mensajes acumulados"""
+        if self.log_buffer:
+            lines = "\n".join(self.log_buffer) + "\n"
+            self.log_buffer.clear()
+            
+            self.log_text.config(state='normal')
+            self.log_text.insert(tk.END, lines)
+            
+            # Conserva solo las últimas LOG_MAX_LINES líneas
+            line_count = int(self.log_text.index('end-1c').split('.')[0]) - 1
+            if line_count > LOG_MAX_LINES:
+                self.log_text.delete('1.0', f"{line_count - LOG_MAX_LINES + 1}.0")
+            
+            self.log_text.see(tk.END)
+            self.log_text.config(state='disabled')
+        
+        self.root.after(LOG_FLUSH_MS, self.flush_log)
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = EmailSenderApp(root)
+    
+    # En el ejecutable creado con --splash, la imagen de carga se cierra al
+    # aparecer la ventana
+    try:
+        import pyi_splash
+        pyi_splash.close()
+    except ImportError:
+        pass
+    
+    root.after(WARM_UP_DELAY_MS, warm_up)
     root.mainloop()
\ No newline at end of file
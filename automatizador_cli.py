@@ -0,0 +1,119 @@
+"""Envío de campañas sin ventana, para ejecutarlas desatendidas.
+
+Uso::
+
+    python automatizador_cli.py campaña.json [--reanudar] [--conexiones N] [--metricas ARCHIVO]
+
+La campaña se crea desde la aplicación de escritorio ("Guardar Campaña") y
+usa el mismo motor de envío. Este módulo no importa tkinter, de modo que
+arranca rápido y funciona en servidores sin entorno gráfico.
+"""
+import argparse
+import queue
+import sys
+import time
+
+from campaign import (
+    CampaignError, close_engine, create_engine, load_campaign, open_journal,
+    stream_recipients,
+)
+from metrics import SendMetrics, format_duration
+from template_engine import TemplateError
+
+# Cada cuántos segundos se informa el avance
+PROGRESS_SECONDS = 10
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Envío masivo de correos sin ventana")
+    parser.add_argument('campana', help="archivo de campaña (.json) guardado desde la aplicación")
+    parser.add_argument('--reanudar', action='store_true',
+                        help="omite los destinatarios que ya recibieron el mensaje")
+    parser.add_argument('--conexiones', type=int,
+                        help="conexiones SMTP simultáneas por cuenta (sustituye al de la campaña)")
+    parser.add_argument('--metricas', metavar='ARCHIVO',
+                        help="guarda al final los tiempos por etapa y contadores en un JSON")
+    return parser.parse_args(argv)
+
+
+def log(message):
+    print(f"[{time.strftime('%H:%M:%S')}] {message}", flush=True)
+
+
+def run(engine):
+    """Ejecuta el motor y muestra sus eventos; devuelve el código de salida"""
+    engine.start()
+    last_progress = time.monotonic()
+    try:
+        while True:
+            try:
+                kind, data = engine.events.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            if kind == 'log':
+                log(data)
+            elif kind == 'estado':
+                log(f"--- Envío {data} ---")
+            elif kind == 'progreso' and time.monotonic() - last_progress >= PROGRESS_SECONDS:
+                sent, total = data
+                stats = engine.metrics.snapshot()
+                eta = stats['eta_segundos']
+                log(f"Avance: {sent}/{total if total else '?'} correos, "
+                    f"{stats['por_minuto']:.0f} correos/min"
+                    + (f", faltan {format_duration(eta)}" if eta is not None else ""))
+                last_progress = time.monotonic()
+            elif kind == 'fin':
+                success_count, failure_count, cancelled = data
+                return 1 if cancelled or failure_count else 0
+            elif kind == 'error':
+                return 1
+    except KeyboardInterrupt:
+        log("Cancelando el envío (Ctrl+C)...")
+        engine.cancel()
+        engine.join()
+        return 130
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    metrics = SendMetrics()
+    try:
+        accounts, column_mapping, message_text, data_path, attachments = load_campaign(args.campana)
+        if args.conexiones:
+            for config in accounts:
+                config['conexiones'] = args.conexiones
+
+        log(f"Leyendo {data_path}")
+        # Los destinatarios se leen y validan por bloques durante el envío
+        template, recipients = stream_recipients(data_path, column_mapping, message_text)
+    except (OSError, ValueError, CampaignError, TemplateError) as e:
+        log(f"Error: {str(e)}")
+        return 2
+
+    journal = open_journal(data_path, message_text)
+    engine = create_engine(accounts, recipients, column_mapping, template, journal,
+                           resume=args.reanudar, attachments=attachments, metrics=metrics)
+    try:
+        code = run(engine)
+        for line in recipients.summary():
+            log(line)
+        if code == 0 and not recipients.ready:
+            log("No hay destinatarios válidos para enviar")
+            return 2
+        return code
+    finally:
+        close_engine(engine)
+        if engine.audit_log is not None:
+            log(f"Registro completo en: {engine.audit_log.path}")
+        if args.metricas:
+            try:
+                metrics.to_json(args.metricas)
+                log(f"Métricas guardadas en: {args.metricas}")
+            except OSError as e:
+                log(f"No se pudieron guardar las métricas: {str(e)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Microbenchmark: construcción de cada correo con email.mime frente a MessageFactory.
+
+Uso: python benchmarks/bench_mime.py [mensajes] [adjunto]
+
+Compara, por mensaje, el tiempo de CPU y la memoria asignada de:
+
+- el camino original: ``MIMEMultipart`` + ``MIMEText`` serializado con
+  ``BytesGenerator`` (lo que hace ``SMTP.send_message``), más el adjunto
+  codificado de nuevo en cada correo
+- ``MessageFactory.build``, que reutiliza las partes precalculadas
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from email.generator import BytesGenerator
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from mime_factory import MessageFactory
+
+SENDER = "remitente@example.com"
+BODY = ("Estimado/a {nombre},\n\n"
+        + "Le escribimos para informarle de nuestras novedades. " * 30
+        + "\n\nSaludos cordiales,\nEl equipo")
+
+
+def legacy_build(email, body, attachment):
+    """Construcción original por correo, más un adjunto codificado cada vez"""
+    msg = MIMEMultipart()
+    msg['From'] = SENDER
+    msg['To'] = email
+    msg['Subject'] = "Mensaje personalizado"
+    msg.attach(MIMEText(body, 'plain'))
+    if attachment is not None:
+        with open(attachment, 'rb') as f:
+            part = MIMEApplication(f.read(), Name=os.path.basename(attachment))
+        part['Content-Disposition'] = f'attachment; filename="{os.path.basename(attachment)}"'
+        msg.attach(part)
+
+    out = io.BytesIO()
+    BytesGenerator(out).flatten(msg, linesep='\r\n')
+    return out.getvalue()
+
+
+def measure(label, build, count):
+    bodies = [BODY.replace("{nombre}", f"Cliente {i}") for i in range(count)]
+    emails = [f"cliente{i}@example.com" for i in range(count)]
+
+    start = time.process_time()
+    for email, body in zip(emails, bodies):
+        build(email, body)
+    cpu = time.process_time() - start
+
+    tracemalloc.start()
+    sample = min(count, 200)
+    for email, body in zip(emails[:sample], bodies[:sample]):
+        build(email, body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<22} {cpu / count * 1e6:9.1f} µs/correo  "
+          f"pico {peak / 1024:8.1f} KiB ({sample} correos)")
+    return cpu / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    attachment = sys.argv[2] if len(sys.argv) > 2 else None
+    cleanup = None
+    if attachment is None:
+        # Adjunto sintético de 200 KiB
+        fd, attachment = tempfile.mkstemp(suffix=".pdf")
+        os.write(fd, os.urandom(200 * 1024))
+        os.close(fd)
+        cleanup = attachment
+
+    try:
+        for with_attachment in (False, True):
+            path = attachment if with_attachment else None
+            print(f"--- {count} correos, {'con' if path else 'sin'} adjunto ---")
+            legacy = measure("email.mime", lambda e, b: legacy_build(e, b, path), count)
+            factory = MessageFactory(SENDER, attachments=[path] if path else [])
+            fast = measure("MessageFactory", factory.build, count)
+            print(f"Aceleración: x{legacy / fast:.1f}")
+    finally:
+        if cleanup:
+            os.remove(cleanup)
+
+
+if __name__ == "__main__":
+    main()
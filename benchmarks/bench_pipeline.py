@@ -0,0 +1,245 @@
+"""Benchmark del envío completo (carga → personalización → envío) sin salir a Internet.
+
+Uso: python benchmarks/bench_pipeline.py [--filas 1000 10000 100000]
+         [--conexiones 4] [--latencia 0] [--errores 0] [--desconexiones 0]
+         [--sin-original]
+
+Genera hojas sintéticas, arranca ``smtp_sink.py`` en otro proceso y, para
+cada tamaño, ejecuta en un proceso aparte:
+
+- ``original``: el bucle secuencial de ``send_emails`` (``read_csv``,
+  ``iterrows`` + ``str.replace``, ``MIMEMultipart`` y ``send_message`` por
+  una única conexión)
+- ``motor``: ``campaign.load_recipients`` + ``SendEngine`` con su grupo de
+  conexiones y el registro de campaña
+
+Informa correos por segundo, latencia por correo (p50/p99 de la
+transacción SMTP) y el pico de memoria (RSS) de cada proceso.
+"""
+import argparse
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+SENDER = "remitente@example.com"
+MAPPING = {'email': 'email', 'nombre': 'nombre'}
+TEMPLATE = (
+    "Estimado/a {nombre},\n\n"
+    "Su cuenta {cuenta} en {ciudad} tiene un saldo de {saldo} con vencimiento el {vencimiento}.\n\n"
+    + "Texto fijo de relleno para alargar el mensaje. " * 10
+    + "\n\nSaludos,\n{gestor}"
+)
+
+
+def make_sheet(path, rows):
+    """Escribe un CSV sintético con las columnas de la plantilla y algunas más"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'email': [f"cliente{i}@example.com" for i in range(rows)],
+        'nombre': [f"Cliente {i}" for i in range(rows)],
+        'cuenta': rng.integers(10 ** 7, 10 ** 8, rows),
+        'ciudad': rng.choice(["Madrid", "Lima", "Bogotá", "Quito", "Santiago"], rows),
+        'saldo': rng.integers(0, 100000, rows) / 100,
+        'vencimiento': "2026-12-31",
+        'gestor': rng.choice(["Ana", "Luis", "Marta"], rows),
+    })
+    for c in range(8):
+        df[f"extra_{c}"] = rng.integers(0, 1000, rows)
+    df.to_csv(path, index=False)
+
+
+def peak_rss_mb():
+    """Pico de memoria residente del proceso en MiB, o None si no se puede medir"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil  # Windows
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 2 ** 20
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2 ** 20 if sys.platform == 'darwin' else rss / 2 ** 10
+
+
+def smtp_config(port, connections):
+    return {
+        'servidor': '127.0.0.1', 'puerto': port, 'email': SENDER, 'password': 'x',
+        'conexiones': connections, 'proveedor': '', 'starttls': False,
+    }
+
+
+def run_original(path, config):
+    """Bucle secuencial original de send_emails; devuelve las latencias por correo"""
+    from send_engine import open_smtp_connection
+
+    df = pd.read_csv(path)
+    latencies = []
+    server = open_smtp_connection(config)
+    for _, row in df.iterrows():
+        email = row[MAPPING['email']]
+        personalized_msg = TEMPLATE
+        for col in df.columns:
+            if pd.notna(row[col]):
+                personalized_msg = personalized_msg.replace(f"{{{col}}}", str(row[col]))
+
+        msg = MIMEMultipart()
+        msg['From'] = config['email']
+        msg['To'] = email
+        msg['Subject'] = "Mensaje personalizado"
+        msg.attach(MIMEText(personalized_msg, 'plain'))
+
+        start = time.perf_counter()
+        try:
+            server.send_message(msg)
+        except Exception:
+            pass  # El original anota el fallo y sigue con la siguiente fila
+        latencies.append(time.perf_counter() - start)
+    try:
+        server.quit()
+    except Exception:
+        pass  # Tras una desconexión, el original falla todas las filas restantes
+    return latencies, len(df)
+
+
+def run_engine(path, config):
+    """Campaña completa con SendEngine; devuelve las latencias por correo"""
+    from campaign import load_recipients
+    from campaign_journal import CampaignJournal
+    from send_engine import SendEngine
+
+    latencies = []
+
+    class TimedEngine(SendEngine):
+        def _send(self, account, server, email, msg):
+            start = time.perf_counter()
+            try:
+                return super()._send(account, server, email, msg)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+    template, report = load_recipients(path, MAPPING, TEMPLATE)
+    with tempfile.TemporaryDirectory() as journal_dir:
+        journal = CampaignJournal.for_campaign(path, TEMPLATE, journal_dir)
+        engine = TimedEngine(config, report.clean, MAPPING, template, journal=journal)
+        engine.start()
+        while True:
+            try:
+                kind, data = engine.events.get(timeout=1)
+            except queue.Empty:
+                continue
+            if kind in ('fin', 'error'):
+                break
+        engine.join()
+        journal.close()
+    if kind == 'error':
+        raise RuntimeError(data)
+    return latencies, len(report.clean)
+
+
+def run_case(args):
+    """Ejecuta un caso en este proceso e imprime el resultado como JSON"""
+    config = smtp_config(args.puerto, args.conexiones)
+    runner = run_original if args.caso == 'original' else run_engine
+
+    start = time.perf_counter()
+    latencies, count = runner(args.archivo, config)
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    print(json.dumps({
+        'correos': count,
+        'segundos': elapsed,
+        'por_segundo': count / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+        'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+        'rss_mb': peak_rss_mb(),
+    }))
+
+
+def start_sink(args):
+    """Arranca smtp_sink.py en otro proceso y devuelve ``(proceso, puerto)``"""
+    command = [sys.executable, os.path.join(ROOT, 'smtp_sink.py'), '--puerto', '0',
+               '--latencia', str(args.latencia), '--errores', str(args.errores),
+               '--desconexiones', str(args.desconexiones), '--semilla', '0']
+    sink = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    # Primera línea: "Servidor SMTP de pruebas escuchando en host:puerto"
+    port = int(sink.stdout.readline().rsplit(':', 1)[1])
+    return sink, port
+
+
+def spawn_case(case, path, port, args):
+    command = [sys.executable, os.path.abspath(__file__), '--caso', case, '--archivo', path,
+               '--puerto', str(port), '--conexiones', str(args.conexiones)]
+    output = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def format_number(value, spec='8.2f'):
+    return format(value, spec) if value is not None else f"{'n/d':>8}"
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--conexiones', type=int, default=4)
+    parser.add_argument('--latencia', type=float, default=0.0,
+                        help="segundos que tarda el servidor en aceptar cada correo")
+    parser.add_argument('--errores', type=float, default=0.0)
+    parser.add_argument('--desconexiones', type=float, default=0.0)
+    parser.add_argument('--sin-original', action='store_true',
+                        help="no mide el bucle original (lento con muchas filas)")
+    # Uso interno: ejecución de un caso en un proceso aparte
+    parser.add_argument('--caso', choices=['original', 'motor'], help=argparse.SUPPRESS)
+    parser.add_argument('--archivo', help=argparse.SUPPRESS)
+    parser.add_argument('--puerto', type=int, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if args.caso:
+        run_case(args)
+        return
+
+    cases = ['motor'] if args.sin_original else ['original', 'motor']
+    sink, port = start_sink(args)
+    print(f"Servidor de pruebas en 127.0.0.1:{port} (latencia {args.latencia} s, "
+          f"errores {args.errores:.1%}, desconexiones {args.desconexiones:.1%}); "
+          f"{args.conexiones} conexiones para el motor")
+    print(f"{'filas':>8} {'caso':<9} {'segundos':>9} {'correos/s':>10} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'RSS MiB':>8}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for rows in args.filas:
+                path = os.path.join(tmp, f"clientes_{rows}.csv")
+                make_sheet(path, rows)
+                results = {}
+                for case in cases:
+                    result = results[case] = spawn_case(case, path, port, args)
+                    print(f"{rows:>8} {case:<9} {result['segundos']:9.2f} "
+                          f"{result['por_segundo']:10.0f} {format_number(result['p50_ms'])} "
+                          f"{format_number(result['p99_ms'])} "
+                          f"{format_number(result['rss_mb'], '8.0f')}", flush=True)
+                if len(results) == 2:
+                    speedup = results['motor']['por_segundo'] / results['original']['por_segundo']
+                    print(f"{'':>8} aceleración x{speedup:.1f}")
+    finally:
+        sink.terminate()
+        sink.wait()
+
+
+if __name__ == "__main__":
+    main()
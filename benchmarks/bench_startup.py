@@ -0,0 +1,102 @@
+"""Benchmark del arranque de la aplicación: tiempo hasta que aparece la ventana.
+
+Uso: python benchmarks/bench_startup.py [--repeticiones 7]
+
+Cada medición arranca un intérprete nuevo (como al abrir el ejecutable) y
+cronometra desde el lanzamiento hasta que la ventana principal se ha
+dibujado por primera vez:
+
+- ``anticipada``: importa antes de crear la ventana todo lo que importaba
+  la cabecera original (pandas, el motor de Excel, smtplib y email.mime,
+  además de los módulos de la campaña)
+- ``diferida``: el arranque actual de ``automatizador``, que deja esos
+  módulos para ``warm_up``
+
+Sin pantalla disponible (Tk no puede abrir la ventana) solo se mide el
+tiempo hasta tener los módulos importados, y así se indica.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+# Lo que la versión anterior cargaba antes de mostrar la ventana
+EAGER_MODULES = ('pandas', 'numpy', 'openpyxl', 'smtplib', 'email.mime.multipart',
+                 'email.mime.text', 'email.mime.application', 'contacts_cache',
+                 'campaign', 'data_loader', 'live_preview', 'send_engine',
+                 'template_engine')
+
+
+def run_case(case):
+    """Arranca la aplicación en este proceso e indica cuándo está la ventana"""
+    import importlib
+
+    if case == 'anticipada':
+        for name in EAGER_MODULES:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass
+    import automatizador
+
+    try:
+        root = automatizador.tk.Tk()
+    except automatizador.tk.TclError:
+        print("importado", flush=True)
+        return
+    automatizador.EmailSenderApp(root)
+    root.update()
+    print("ventana", flush=True)
+    root.destroy()
+
+
+def measure(case):
+    """Segundos desde el lanzamiento del proceso hasta su aviso, y qué se midió"""
+    command = [sys.executable, os.path.abspath(__file__), '--caso', case]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline().strip()
+    elapsed = time.perf_counter() - start
+    process.wait()
+    if process.returncode:
+        raise RuntimeError(f"El caso {case} terminó con código {process.returncode}")
+    return elapsed, line
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticiones', type=int, default=7)
+    # Uso interno: arranque de un caso en un proceso aparte
+    parser.add_argument('--caso', choices=['anticipada', 'diferida'], help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if args.caso:
+        run_case(args.caso)
+        return
+
+    # Un arranque previo de cada caso deja los archivos en la caché del sistema
+    for case in ('anticipada', 'diferida'):
+        measure(case)
+
+    results = {}
+    print(f"{'caso':<11} {'mediana ms':>11} {'mín ms':>8} {'máx ms':>8}  medido hasta")
+    for case in ('anticipada', 'diferida'):
+        runs = [measure(case) for _ in range(args.repeticiones)]
+        times = [elapsed * 1000 for elapsed, _ in runs]
+        results[case] = statistics.median(times)
+        reached = "primera ventana" if runs[0][1] == 'ventana' else "importación (sin pantalla)"
+        print(f"{case:<11} {results[case]:11.0f} {min(times):8.0f} {max(times):8.0f}  {reached}",
+              flush=True)
+    print(f"aceleración x{results['anticipada'] / results['diferida']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Flujo completo de una campaña, sin dependencias de la interfaz gráfica.
+
+Reúne los pasos que comparten la aplicación de escritorio y el modo sin
+ventana (``automatizador_cli.py``): cargar los datos, comprobar el mapeo,
+compilar la plantilla, validar los destinatarios y crear el motor de envío
+con su registro de campaña y su archivo de auditoría.
+
+Una campaña guardada es un archivo JSON::
+
+    {
+        "cuentas": [
+            {"proveedor": "Gmail", "servidor": "smtp.gmail.com",
+             "puerto": 587, "email": "...", "password": "...",
+             "conexiones": 4},
+            ...
+        ],
+        "mapeo": {"email": "email", "nombre": "nombre"},
+        "mensaje": "Hola {nombre}, ...",
+        "datos": "C:/ruta/clientes.xlsx",
+        "adjuntos": ["C:/ruta/folleto.pdf"]
+    }
+
+Con varias cuentas el envío se reparte entre ellas (ver
+:mod:`sender_accounts`). Los archivos anteriores, con una única cuenta en la
+sección ``smtp``, se siguen leyendo. Si ``password`` está vacío se usa la
+variable de entorno ``SMTP_PASSWORD_<n>`` (``n`` = posición de la cuenta,
+desde 1) o, si no existe, ``SMTP_PASSWORD``. Para probar contra el servidor
+local :mod:`smtp_sink` se añade ``"starttls": false`` a la cuenta.
+"""
+import json
+import os
+
+from campaign_journal import CampaignJournal
+from data_loader import iter_chunks, load_table, read_columns
+from metrics import SendMetrics
+from recipients import RecipientStream, validate_recipients
+from send_engine import SendEngine
+from send_log import AuditLog
+from sender_accounts import QuotaStore
+from template_engine import compile_template
+
+PASSWORD_ENV = 'SMTP_PASSWORD'
+
+
+class CampaignError(ValueError):
+    """La campaña no está completa o no coincide con los datos"""
+
+
+def save_campaign(path, accounts, column_mapping, message_text, data_path,
+                  attachments=(), include_password=False):
+    """Guarda la configuración de una campaña en un archivo JSON"""
+    accounts = [dict(config) for config in accounts]
+    if not include_password:
+        for config in accounts:
+            config['password'] = ''
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'cuentas': accounts,
+            'mapeo': dict(column_mapping),
+            'mensaje': message_text,
+            'datos': os.path.abspath(data_path),
+            'adjuntos': [os.path.abspath(attachment) for attachment in attachments],
+        }, f, ensure_ascii=False, indent=2)
+
+
+def load_campaign(path):
+    """Lee un archivo de campaña.
+
+    Devuelve ``(cuentas, mapeo, mensaje, datos, adjuntos)``; ``cuentas`` es
+    una lista de configuraciones SMTP.
+    """
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    try:
+        accounts = data['cuentas'] if 'cuentas' in data else [data['smtp']]
+        column_mapping = dict(data['mapeo'])
+        message_text = data['mensaje']
+        data_path = data['datos']
+    except KeyError as e:
+        raise CampaignError(f"Falta la sección {e} en el archivo de campaña")
+    if not accounts:
+        raise CampaignError("La campaña no tiene cuentas de envío")
+
+    accounts = [_account_config(config, n) for n, config in enumerate(accounts, 1)]
+
+    # Las rutas relativas se interpretan desde la carpeta de la campaña
+    base_dir = os.path.dirname(os.path.abspath(path))
+    data_path = os.path.join(base_dir, data_path)
+    attachments = [os.path.join(base_dir, attachment) for attachment in data.get('adjuntos', [])]
+
+    if not message_text.strip():
+        raise CampaignError("El mensaje de la campaña está vacío")
+
+    return accounts, column_mapping, message_text, data_path, attachments
+
+
+def _account_config(config, position):
+    """Completa y comprueba la configuración SMTP de una cuenta de la campaña"""
+    config = dict(config)
+    config['puerto'] = int(config.get('puerto', 587))
+    config['conexiones'] = int(config.get('conexiones', 1))
+    config.setdefault('proveedor', '')
+    if not config.get('password'):
+        config['password'] = (os.environ.get(f"{PASSWORD_ENV}_{position}")
+                              or os.environ.get(PASSWORD_ENV, ''))
+
+    missing = [key for key in ('servidor', 'email', 'password') if not config.get(key)]
+    if missing:
+        raise CampaignError(f"Faltan datos SMTP de la cuenta {position}: {', '.join(missing)}")
+    return config
+
+
+def missing_columns(columns, column_mapping):
+    """Columnas del mapeo que no existen en los datos"""
+    return [col for col in column_mapping.values() if col not in columns]
+
+
+def prepare_recipients(df, column_mapping, message_text):
+    """Compila la plantilla y valida los destinatarios.
+
+    Devuelve ``(template, report)``. Lanza :class:`CampaignError` si faltan
+    columnas del mapeo y :class:`~template_engine.TemplateError` si la
+    plantilla usa columnas desconocidas.
+    """
+    missing = missing_columns(df.columns, column_mapping)
+    if missing:
+        raise CampaignError(f"Columnas faltantes: {', '.join(map(str, missing))}")
+
+    template = compile_template(message_text, df.columns)
+    report = validate_recipients(df, column_mapping['email'], template.labels.values())
+    return template, report
+
+
+def load_recipients(data_path, column_mapping, message_text, metrics=None):
+    """Lee solo las columnas necesarias del archivo y prepara los destinatarios.
+
+    Si se da ``metrics`` (:class:`~metrics.SendMetrics`), anota en él el
+    tiempo de lectura y de validación.
+    """
+    if metrics is None:
+        metrics = SendMetrics()
+    template = compile_template(message_text)
+    columns = list(dict.fromkeys([*column_mapping.values(), *template.columns]))
+    with metrics.timer('carga'):
+        df = load_table(data_path, columns)
+    with metrics.timer('validacion'):
+        return prepare_recipients(df, column_mapping, message_text)
+
+
+def stream_recipients(data_path, column_mapping, message_text):
+    """Prepara la lectura por bloques de los destinatarios, sin leer sus filas.
+
+    Comprueba el mapeo y la plantilla con el encabezado del archivo y
+    devuelve ``(template, recipients)``, donde ``recipients`` es una
+    :class:`~recipients.RecipientStream` sobre las columnas necesarias. El
+    motor de envío empieza a enviar con el primer bloque; la lectura y la
+    validación del resto ocurren durante el envío y su tiempo cuenta como
+    lectura del archivo.
+    """
+    columns = read_columns(data_path)
+    missing = missing_columns(columns, column_mapping)
+    if missing:
+        raise CampaignError(f"Columnas faltantes: {', '.join(map(str, missing))}")
+
+    template = compile_template(message_text, columns)
+    needed = [*column_mapping.values(), *template.labels.values()]
+    recipients = RecipientStream(iter_chunks(data_path, needed),
+                                 column_mapping['email'], template.labels.values())
+    return template, recipients
+
+
+def open_journal(data_path, message_text):
+    """Abre el registro de la campaña para poder reanudarla.
+
+    La campaña se identifica por el archivo de datos y el mensaje, de modo
+    que puede reanudarse aunque cambien las cuentas de envío.
+    """
+    return CampaignJournal.for_campaign(data_path, message_text)
+
+
+def create_engine(accounts, recipients, column_mapping, template, journal,
+                  resume=False, audit_log=None, attachments=(), metrics=None):
+    """Crea el motor de envío de la campaña (sin iniciarlo).
+
+    ``recipients`` es un DataFrame ya validado o una
+    :class:`~recipients.RecipientStream` que se lee durante el envío.
+    """
+    if not resume:
+        journal.clear()
+    if audit_log is None:
+        try:
+            audit_log = AuditLog()
+        except OSError:
+            audit_log = None  # Sin archivo de auditoría, el envío sigue igual
+    return SendEngine(accounts, recipients, column_mapping, template,
+                      journal=journal, resume=resume, audit_log=audit_log,
+                      attachments=attachments, metrics=metrics, quotas=QuotaStore())
+
+
+def close_engine(engine):
+    """Guarda el cupo diario y cierra el registro de campaña y el archivo de auditoría del motor"""
+    engine.save_quotas()
+    if engine.journal is not None:
+        engine.journal.close()
+    if engine.audit_log is not None:
+        engine.audit_log.close()
@@ -0,0 +1,123 @@
+"""Registro persistente del estado de cada destinatario de una campaña.
+
+Cada campaña (misma lista de clientes y mismo mensaje) tiene su propio archivo SQLite en modo WAL donde se anota el resultado de
+cada fila. Si el envío se interrumpe, el modo "Reanudar envío" consulta el
+registro para omitir las filas que ya se entregaron.
+
+Las anotaciones se acumulan en memoria y se escriben por lotes para que el
+registro no frene el envío; el motor de envío vuelca además las pendientes
+cada pocos segundos aunque no lleguen resultados nuevos (por ejemplo, durante
+una pausa por saturación del servidor).
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import contacts_cache
+from app_paths import APP_DIR
+
+JOURNAL_DIR = os.path.join(APP_DIR, 'campanas')
+
+# Se escribe a disco cada FLUSH_ROWS anotaciones o cada FLUSH_SECONDS
+FLUSH_ROWS = 500
+FLUSH_SECONDS = 1.0
+
+SENT = 'enviado'
+FAILED = 'fallido'
+
+
+def campaign_id(data_path, message_text):
+    """Identifica la campaña por el contenido del archivo y el mensaje.
+
+    El remitente no forma parte de la clave: quién recibió ya el mensaje no
+    depende de la cuenta que lo envió, y una campaña puede reanudarse con
+    otras cuentas (por ejemplo, cuando una agota su cupo diario).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(contacts_cache.cache_key(data_path).encode())
+    digest.update(message_text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class CampaignJournal:
+    """Registro de solo anexado del estado de cada fila de una campaña.
+
+    Es seguro usarlo desde varios hilos: :meth:`record` solo agrega a un
+    búfer y el hilo que lo llena lo vuelca con un único ``executemany``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS envios ("
+            " fila INTEGER PRIMARY KEY,"
+            " email TEXT,"
+            " estado TEXT NOT NULL,"
+            " detalle TEXT,"
+            " fecha REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def for_campaign(cls, data_path, message_text, journal_dir=JOURNAL_DIR):
+        """Abre (o crea) el registro de la campaña"""
+        key = campaign_id(data_path, message_text)
+        return cls(os.path.join(journal_dir, f"{key}.sqlite"))
+
+    def record(self, index, email, status, detail=''):
+        """Anota el resultado de una fila"""
+        with self._lock:
+            self._buffer.append((index, str(email), status, detail, time.time()))
+            if (len(self._buffer) >= FLUSH_ROWS
+                    or time.monotonic() - self._last_flush >= FLUSH_SECONDS):
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self._buffer:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO envios (fila, email, estado, detalle, fecha)"
+                " VALUES (?, ?, ?, ?, ?)",
+                self._buffer,
+            )
+            self._conn.commit()
+            self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def flush_if_due(self):
+        """Escribe las anotaciones pendientes si pasó ``FLUSH_SECONDS`` desde la última escritura"""
+        with self._lock:
+            if self._buffer and time.monotonic() - self._last_flush >= FLUSH_SECONDS:
+                self._flush_locked()
+
+    def flush(self):
+        """Escribe a disco las anotaciones pendientes"""
+        with self._lock:
+            self._flush_locked()
+
+    def delivered_rows(self):
+        """Devuelve el conjunto de filas ya entregadas"""
+        self.flush()
+        with self._lock:
+            cursor = self._conn.execute("SELECT fila FROM envios WHERE estado = ?", (SENT,))
+            return {fila for (fila,) in cursor}
+
+    def clear(self):
+        """Olvida todas las anotaciones (para enviar la campaña desde cero)"""
+        with self._lock:
+            self._buffer = []
+            self._conn.execute("DELETE FROM envios")
+            self._conn.commit()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,138 @@
+"""Caché en disco de las listas de clientes ya leídas.
+
+La primera lectura de un archivo guarda la tabla en un formato binario
+rápido (Feather si está disponible ``pyarrow``, pickle si no). Las lecturas
+siguientes del mismo contenido la recuperan en milisegundos sin volver a
+analizar el Excel.
+
+Las entradas se identifican por el hash del contenido del archivo; un índice
+guarda la ruta, fecha de modificación y tamaño de cada archivo para no
+recalcular el hash si no cambió. Cuando la caché supera ``MAX_CACHE_BYTES``
+se eliminan las entradas usadas hace más tiempo.
+"""
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from app_paths import APP_DIR
+
+CACHE_DIR = os.path.join(APP_DIR, 'cache')
+MAX_CACHE_BYTES = 500 * 1024 * 1024
+INDEX_FILE = 'index.json'
+# Versión de la lectura de los archivos: al cambiar cómo se interpretan (por
+# ejemplo, la codificación de los CSV) las entradas anteriores dejan de usarse
+READER_VERSION = 2
+
+
+def _read_index(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, INDEX_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_index(cache_dir, index):
+    path = os.path.join(cache_dir, INDEX_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(path + '.tmp', path)
+
+
+def file_digest(filepath):
+    """Calcula el hash del contenido del archivo"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(filepath, cache_dir=CACHE_DIR):
+    """Devuelve la clave de caché del archivo.
+
+    Reutiliza el hash guardado si la ruta, la fecha de modificación y el
+    tamaño no cambiaron; si cambiaron, vuelve a calcularlo.
+    """
+    filepath = os.path.abspath(filepath)
+    stat = os.stat(filepath)
+    index = _read_index(cache_dir)
+
+    entry = index.get(filepath)
+    if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+        return entry['digest']
+
+    digest = file_digest(filepath)
+    # Aprovecha para olvidar archivos que ya no existen
+    index = {path: entry for path, entry in index.items() if os.path.exists(path)}
+    index[filepath] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'digest': digest}
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_index(cache_dir, index)
+    return digest
+
+
+def _entry_paths(cache_dir, key):
+    base = os.path.join(cache_dir, f"{key}.v{READER_VERSION}")
+    return base + '.feather', base + '.pkl'
+
+
+def load(filepath, cache_dir=CACHE_DIR):
+    """Devuelve la tabla en caché del archivo o None si no está"""
+    try:
+        key = cache_key(filepath, cache_dir)
+    except OSError:
+        return None
+
+    feather_path, pickle_path = _entry_paths(cache_dir, key)
+    try:
+        if os.path.exists(feather_path):
+            df = pd.read_feather(feather_path)
+            os.utime(feather_path)  # Marca la entrada como usada recientemente
+            return df
+        if os.path.exists(pickle_path):
+            df = pd.read_pickle(pickle_path)
+            os.utime(pickle_path)
+            return df
+    except Exception:
+        # Entrada dañada o ilegible: se ignora y se vuelve a leer el archivo
+        return None
+    return None
+
+
+def store(filepath, df, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Guarda la tabla del archivo en la caché; los errores se ignoran"""
+    try:
+        key = cache_key(filepath, cache_dir)
+        feather_path, pickle_path = _entry_paths(cache_dir, key)
+        try:
+            df.to_feather(feather_path + '.tmp')
+            os.replace(feather_path + '.tmp', feather_path)
+        except Exception:
+            # Sin pyarrow, o columnas que Feather no admite (nombres no
+            # textuales, tipos mezclados): se usa pickle
+            if os.path.exists(feather_path + '.tmp'):
+                os.remove(feather_path + '.tmp')
+            df.to_pickle(pickle_path + '.tmp')
+            os.replace(pickle_path + '.tmp', pickle_path)
+        evict(cache_dir, max_bytes)
+    except Exception:
+        pass
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Elimina las entradas menos usadas hasta quedar por debajo de ``max_bytes``"""
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith(('.feather', '.pkl')):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
@@ -0,0 +1,204 @@
+"""Lectura por bloques de las listas de clientes.
+
+Admite Excel (.xlsx/.xls), CSV y Parquet. Los archivos se leen en bloques de
+filas para que el envío y la vista previa puedan empezar antes de terminar
+la lectura, y opcionalmente solo con las columnas que se van a usar.
+"""
+import codecs
+import csv
+import os
+
+import pandas as pd
+
+# Filtros para el diálogo de selección de archivo
+FILETYPES = [
+    ("Listas de clientes", "*.xlsx *.xls *.csv *.parquet"),
+    ("Excel files", "*.xlsx *.xls"),
+    ("CSV", "*.csv"),
+    ("Parquet", "*.parquet"),
+]
+
+CHUNK_SIZE = 5000
+
+
+def _extension(filepath):
+    return os.path.splitext(filepath)[1].lower()
+
+
+# Codificación de los CSV que no son UTF-8: la de Excel en Windows en español
+LEGACY_ENCODING = 'cp1252'
+
+
+def _csv_encoding(filepath):
+    """UTF-8 (con o sin BOM) si todo el archivo es UTF-8 válido; si no, cp1252"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                decoder.decode(block)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return LEGACY_ENCODING
+    return 'utf-8-sig'
+
+
+def _csv_options(filepath):
+    """Detecta la codificación y el separador del CSV (Excel en español suele usar ';').
+
+    El texto se decodifica de forma estricta: un byte que no encaja en la
+    codificación detectada produce un error en lugar de un carácter
+    sustituido en los mensajes.
+    """
+    encoding = _csv_encoding(filepath)
+    with open(filepath, newline='', encoding=encoding) as f:
+        sample = f.read(64 * 1024)
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        delimiter = ","
+    return {'sep': delimiter, 'encoding': encoding}
+
+
+def _parquet_file(filepath):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Para leer archivos Parquet instala el paquete 'pyarrow'")
+    return pq.ParquetFile(filepath)
+
+
+def read_columns(filepath):
+    """Devuelve los nombres de columna del archivo sin leer sus filas"""
+    ext = _extension(filepath)
+    if ext == '.csv':
+        return list(pd.read_csv(filepath, nrows=0, **_csv_options(filepath)).columns)
+    if ext == '.parquet':
+        return list(_parquet_file(filepath).schema_arrow.names)
+    if ext == '.xlsx':
+        return _read_xlsx_columns(filepath)
+    return list(pd.read_excel(filepath, nrows=0).columns)
+
+
+def _xlsx_header(rows):
+    """Nombres de columna de la primera fila de un .xlsx, como los asigna pandas.
+
+    Las celdas vacías al final del encabezado se descartan (las hojas con
+    formato en celdas vacías las incluyen), las intermedias se llaman
+    ``Unnamed: <n>`` y los nombres repetidos reciben un sufijo ``.1``,
+    ``.2``... Devuelve None si la hoja está vacía.
+    """
+    header = list(next(rows, None) or ())
+    while header and header[-1] is None:
+        header.pop()
+    if not header:
+        return None
+    return _dedup_names([f"Unnamed: {i}" if name is None else name
+                         for i, name in enumerate(header)])
+
+
+def _dedup_names(names):
+    """Renombra los encabezados repetidos como pandas: ``tel``, ``tel.1``, ``tel.2``"""
+    counts = {}
+    result = []
+    for name in names:
+        count = counts.get(name, 0)
+        while count:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        counts[name] = 1
+        result.append(name)
+    return result
+
+
+def _read_xlsx_columns(filepath):
+    """Encabezado de un .xlsx con las mismas reglas que :func:`iter_chunks`"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        return _xlsx_header(workbook.worksheets[0].iter_rows(values_only=True)) or []
+    finally:
+        workbook.close()
+
+
+def _iter_xlsx(filepath, columns, chunksize):
+    """Lee un .xlsx en modo solo lectura de openpyxl, sin cargarlo entero"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = _xlsx_header(rows)
+        if header is None:
+            return
+        if columns is None:
+            positions = list(range(len(header)))
+        else:
+            missing = [col for col in columns if col not in header]
+            if missing:
+                raise ValueError(f"Columnas faltantes: {', '.join(map(str, missing))}")
+            positions = [header.index(col) for col in columns]
+        names = [header[i] for i in positions]
+
+        batch = []
+        blank = []  # Filas vacías pendientes: se descartan si no hay datos después
+        offset = 0
+        for row in rows:
+            # openpyxl recorta las filas cortas; se completan con vacíos
+            values = [row[i] if i < len(row) else None for i in positions]
+            if all(cell is None for cell in row):
+                blank.append(values)
+                continue
+            batch.extend(blank)
+            blank = []
+            batch.append(values)
+            if len(batch) >= chunksize:
+                yield _frame(batch, names, offset)
+                offset += len(batch)
+                batch = []
+        if batch:
+            yield _frame(batch, names, offset)
+    finally:
+        workbook.close()
+
+
+def _frame(rows, columns, offset):
+    """Crea el DataFrame de un bloque con el índice continuando desde ``offset``"""
+    return pd.DataFrame(rows, columns=columns, index=pd.RangeIndex(offset, offset + len(rows)))
+
+
+def iter_chunks(filepath, columns=None, chunksize=CHUNK_SIZE):
+    """Genera DataFrames de hasta ``chunksize`` filas con los datos del archivo.
+
+    Si se indican ``columns``, solo se leen esas columnas. El índice de cada
+    bloque continúa el del anterior, de modo que identifica la fila dentro
+    del archivo completo.
+    """
+    ext = _extension(filepath)
+    if columns is not None:
+        columns = list(dict.fromkeys(columns))
+
+    if ext == '.csv':
+        yield from pd.read_csv(filepath, usecols=columns, chunksize=chunksize,
+                               **_csv_options(filepath))
+    elif ext == '.parquet':
+        offset = 0
+        for batch in _parquet_file(filepath).iter_batches(batch_size=chunksize, columns=columns):
+            chunk = batch.to_pandas()
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield chunk
+    elif ext == '.xlsx':
+        yield from _iter_xlsx(filepath, columns, chunksize)
+    else:
+        # El formato .xls antiguo no admite lectura por bloques
+        yield pd.read_excel(filepath, usecols=columns)
+
+
+def load_table(filepath, columns=None):
+    """Lee el archivo completo en un único DataFrame"""
+    chunks = list(iter_chunks(filepath, columns))
+    if not chunks:
+        return pd.DataFrame(columns=columns or read_columns(filepath))
+    return pd.concat(chunks, ignore_index=True)
@@ -0,0 +1,110 @@
+"""Previsualización en vivo del mensaje mientras se escribe.
+
+La vista previa se recalcula en cada edición, así que no puede recorrer el
+DataFrame: :class:`PreviewRenderer` guarda en caché el texto de cada celda
+de las filas de muestra, columna a columna y solo para las columnas que la
+plantilla usa. Al editar, la plantilla se vuelve a dividir en segmentos
+(una expresión regular sobre el texto del editor) y cada marcador se
+resuelve con una consulta a la caché, sin importar cuántas columnas tenga
+la hoja. :func:`changed_span` limita además la actualización del widget al
+tramo del texto que cambió.
+"""
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+from template_engine import compile_template
+
+# Filas cuyos textos se guardan en caché para recorrerlas al instante
+SAMPLE_ROWS = 200
+
+# Caracteres fuera del plano básico: Tk los cuenta distinto que Python
+ASTRAL_RE = re.compile('[\U00010000-\U0010FFFF]')
+
+
+def changed_span(old, new):
+    """Tramo que cambia de ``old`` a ``new``: ``(inicio, fin_en_old, texto_nuevo)``"""
+    start = len(os.path.commonprefix([old, new]))
+    # El sufijo común no puede solaparse con el prefijo común
+    limit = min(len(old), len(new)) - start
+    end = min(limit, len(os.path.commonprefix([old[start:][::-1], new[start:][::-1]])))
+    return start, len(old) - end, new[start:len(new) - end]
+
+
+def needs_full_redraw(*texts):
+    """Indica si los índices por carácter de Tk no coinciden con los de Python"""
+    return any(ASTRAL_RE.search(text) for text in texts)
+
+
+class PreviewRenderer:
+    """Personaliza la plantilla con las filas de un DataFrame usando textos en caché"""
+
+    def __init__(self, df, sample_rows=SAMPLE_ROWS):
+        self.df = df
+        self.labels = {str(col): col for col in df.columns}
+        self.sample_rows = min(sample_rows, len(df))
+        self._cells = {}  # Columna -> textos de las filas de muestra (None si vacío)
+        self._lengths = {}  # Columna -> longitud del texto en todas las filas
+        self._template = (None, None)  # Último texto compilado y su plantilla
+
+    @property
+    def row_count(self):
+        return len(self.df)
+
+    def compile(self, text):
+        """Compila la plantilla; se reutiliza mientras el texto no cambie"""
+        if self._template[0] != text:
+            self._template = (text, compile_template(text))
+        return self._template[1]
+
+    def unknown_fields(self, text):
+        """Marcadores de la plantilla que no corresponden a ninguna columna"""
+        return [name for name in self.compile(text).columns if name not in self.labels]
+
+    def _cell(self, name, position):
+        """Texto de una celda, con la misma conversión que ``render_frame``"""
+        if position < self.sample_rows:
+            texts = self._cells.get(name)
+            if texts is None:
+                column = self.df[self.labels[name]].iloc[:self.sample_rows]
+                texts = [None if missing else text for text, missing
+                         in zip(column.astype(str).tolist(), column.isna().tolist())]
+                self._cells[name] = texts
+            return texts[position]
+
+        # Fuera de la muestra: solo se convierte esa celda
+        cell = self.df[self.labels[name]].iloc[position:position + 1]
+        return None if cell.isna().iat[0] else cell.astype(str).iat[0]
+
+    def render(self, text, position):
+        """Mensaje de la fila ``position`` (posición, no etiqueta del índice).
+
+        Los marcadores vacíos o sin columna quedan tal cual, como en el envío.
+        """
+        template = self.compile(text)
+        parts = [template.literals[0]]
+        for field, literal in zip(template.fields, template.literals[1:]):
+            value = self._cell(field, position) if field in self.labels else None
+            parts.append(f"{{{field}}}" if value is None else value)
+            parts.append(literal)
+        return "".join(parts)
+
+    def _column_lengths(self, name):
+        """Longitud del texto de la columna en todas las filas (en caché)"""
+        lengths = self._lengths.get(name)
+        if lengths is None:
+            column = self.df[self.labels[name]]
+            lengths = column.astype(str).str.len().to_numpy(copy=True)
+            lengths[column.isna().to_numpy()] = len(name) + 2  # Queda el marcador
+            self._lengths[name] = lengths
+        return lengths
+
+    def longest_row(self, text):
+        """Posición de la fila con el mensaje más largo en toda la hoja"""
+        counts = Counter(f for f in self.compile(text).fields if f in self.labels)
+        if not counts or not self.row_count:
+            return 0
+        total = sum(self._column_lengths(name) * count for name, count in counts.items())
+        return int(np.argmax(total))
@@ -0,0 +1,168 @@
+"""Métricas de rendimiento de un envío: tiempo por etapa, contadores y velocidad.
+
+Cada etapa del envío (lectura del archivo, personalización, construcción MIME,
+conexión, respuestas del servidor...) acumula su tiempo con
+``time.perf_counter``; el coste por medición es un par de llamadas y una suma
+bajo un lock. Los tiempos de las etapas que se ejecutan en los hilos de
+conexión se suman entre hilos, de modo que el reparto indica dónde se va el
+trabajo aunque el total supere el tiempo transcurrido.
+
+La interfaz consulta :meth:`SendMetrics.snapshot` periódicamente y el
+resultado final puede guardarse como JSON con :meth:`SendMetrics.to_json`.
+"""
+import json
+import threading
+import time
+from collections import deque
+
+# Etapas, en el orden en que se muestran
+STAGES = {
+    'carga': "Lectura del archivo",
+    'validacion': "Validación",
+    'personalizacion': "Personalización",
+    'mime': "Construcción MIME",
+    'conexion': "Conexión TLS y login",
+    'smtp': "Respuesta del servidor",
+    'espera': "Espera por límites",
+    'registro': "Registro en disco",
+}
+
+COUNTERS = ('enviados', 'fallidos', 'omitidos', 'aplazados', 'reconexiones')
+
+# Segundos que abarca el cálculo de la velocidad actual
+RATE_WINDOW = 60
+
+
+def format_duration(seconds):
+    """Texto breve para una duración: '45 s', '3 min 20 s', '1 h 05 min'"""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds} s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes} min {seconds:02d} s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} h {minutes:02d} min"
+
+
+class StageTimer:
+    """Mide un bloque ``with`` y suma su duración a una etapa"""
+
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add(self.stage, time.perf_counter() - self.start)
+
+
+class SendMetrics:
+    """Tiempos por etapa y contadores de un envío; seguro desde varios hilos"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.finished = None
+        self.total = None  # Filas de la campaña, cuando se conocen
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.stage_calls = dict.fromkeys(STAGES, 0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.senders = {}  # Correos enviados por cada cuenta
+        # Correos terminados por segundo: [segundo, cantidad]
+        self._recent = deque(maxlen=RATE_WINDOW + 1)
+        self._first_done = None  # Momento del primer correo terminado
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        """Suma ``seconds`` al tiempo de ``stage``"""
+        with self._lock:
+            self.stage_seconds[stage] += seconds
+            self.stage_calls[stage] += 1
+
+    def timer(self, stage):
+        """Contexto ``with`` que mide el tiempo de ``stage``"""
+        return StageTimer(self, stage)
+
+    def count(self, counter, amount=1):
+        """Incrementa un contador; enviados y fallidos alimentan la velocidad"""
+        with self._lock:
+            self.counters[counter] += amount
+            if counter in ('enviados', 'fallidos'):
+                now = time.monotonic()
+                if self._first_done is None:
+                    self._first_done = now
+                second = int(now)
+                if self._recent and self._recent[-1][0] == second:
+                    self._recent[-1][1] += amount
+                else:
+                    self._recent.append([second, amount])
+
+    def count_sender(self, email):
+        """Anota un correo enviado por la cuenta ``email``"""
+        with self._lock:
+            self.senders[email] = self.senders.get(email, 0) + 1
+
+    def finish(self):
+        """Marca el final del envío; el tiempo transcurrido deja de avanzar"""
+        if self.finished is None:
+            self.finished = time.monotonic()
+
+    def _per_minute(self, now):
+        """Correos por minuto en los últimos RATE_WINDOW segundos"""
+        if self._first_done is None:
+            return 0.0
+        current = int(now)
+        done = sum(n for second, n in self._recent if current - second < RATE_WINDOW)
+        # Al principio la ventana empieza con el primer correo, no con la carga
+        window = min(RATE_WINDOW, max(1.0, now - self._first_done))
+        return done / window * 60
+
+    def snapshot(self):
+        """Estado actual de las métricas como diccionario (serializable a JSON)"""
+        with self._lock:
+            now = self.finished or time.monotonic()
+            elapsed = now - self.started
+            counters = dict(self.counters)
+            seconds = dict(self.stage_seconds)
+            calls = dict(self.stage_calls)
+            senders = dict(self.senders)
+            if self.finished is None:
+                per_minute = self._per_minute(now)
+            else:
+                done = counters['enviados'] + counters['fallidos']
+                per_minute = done / elapsed * 60 if elapsed > 0 else 0.0
+
+        eta = None
+        if self.total is not None and self.finished is None and per_minute > 0:
+            remaining = self.total - counters['enviados'] - counters['fallidos'] - counters['omitidos']
+            eta = max(0, remaining) / per_minute * 60
+
+        stage_total = sum(seconds.values())
+        return {
+            'segundos': round(elapsed, 3),
+            'total': self.total,
+            **counters,
+            'reintentos': counters['aplazados'] + counters['reconexiones'],
+            'por_minuto': round(per_minute, 1),
+            'eta_segundos': round(eta, 1) if eta is not None else None,
+            'cuentas': senders,
+            'etapas': {
+                stage: {
+                    'segundos': round(seconds[stage], 4),
+                    'llamadas': calls[stage],
+                    'porcentaje': round(seconds[stage] / stage_total * 100, 1) if stage_total else 0.0,
+                    'media_ms': round(seconds[stage] / calls[stage] * 1000, 3) if calls[stage] else None,
+                }
+                for stage in STAGES
+            },
+        }
+
+    def to_json(self, path):
+        """Guarda las métricas en un archivo JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
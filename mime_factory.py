@@ -0,0 +1,115 @@
+"""Construcción rápida de los correos de una campaña.
+
+Todos los correos de una campaña comparten remitente, asunto, estructura
+MIME y adjuntos; solo cambian el destinatario y el texto personalizado. La
+fábrica arma una sola vez las partes constantes (cabeceras, límites
+multipart y adjuntos ya codificados en base64) y, por cada destinatario,
+solo inserta la dirección y el cuerpo, sin pasar por ``email.generator``.
+El resultado son bytes listos para ``smtplib.SMTP.sendmail`` o trozos para
+enviar directamente por el socket con :func:`send_engine.send_parts`.
+"""
+import base64
+import re
+import uuid
+from email.header import Header
+
+from attachments import get_attachment
+
+DEFAULT_SUBJECT = "Mensaje personalizado"
+
+# Longitud máxima de línea permitida en un cuerpo sin codificar (RFC 5322)
+MAX_LINE_LENGTH = 998
+
+# Líneas que empiezan con punto: SMTP exige duplicarlo (RFC 5321, 4.5.2)
+LEADING_DOT_RE = re.compile(br'(?m)^\.')
+
+
+def quote_periods(data):
+    return LEADING_DOT_RE.sub(b'..', data)
+
+
+def encode_base64_lines(data):
+    """Codifica en base64 con líneas de 76 caracteres terminadas en CRLF"""
+    return base64.encodebytes(data).replace(b"\n", b"\r\n")
+
+
+def _recipient_bytes(recipient):
+    """Dirección para la cabecera To; rechaza saltos de línea (inyección de cabeceras)"""
+    recipient = str(recipient)
+    if "\r" in recipient or "\n" in recipient:
+        raise ValueError(f"Dirección de correo no válida: {recipient!r}")
+    return recipient.encode('utf-8')
+
+
+class MessageFactory:
+    """Genera los bytes de cada correo a partir de las partes precalculadas.
+
+    ``attachments`` es una lista de rutas de archivo; se obtienen ya
+    codificadas de la caché de :mod:`attachments` y sus bytes se comparten,
+    sin copiarlos, entre todos los correos (ver :meth:`build_parts`).
+    """
+
+    def __init__(self, sender, subject=DEFAULT_SUBJECT, attachments=()):
+        self.sender = sender
+        self.boundary = f"==============={uuid.uuid4().hex}=="
+        boundary = self._boundary = self.boundary.encode('ascii')
+
+        subject_header = Header(subject, 'utf-8').encode() if not subject.isascii() else subject
+        self._head = f"From: {sender}\r\nTo: ".encode('utf-8')
+        self._after_to = (
+            f"\r\nSubject: {subject_header}\r\n"
+            f"MIME-Version: 1.0\r\n"
+            f'Content-Type: multipart/mixed; boundary="{self.boundary}"\r\n'
+            f"\r\n"
+            f"--{self.boundary}\r\n"
+        ).encode('ascii')
+
+        # Cabeceras de la parte de texto según la codificación del cuerpo
+        self._text_7bit = (
+            b'Content-Type: text/plain; charset="us-ascii"\r\n'
+            b"MIME-Version: 1.0\r\n"
+            b"Content-Transfer-Encoding: 7bit\r\n\r\n"
+        )
+        self._text_base64 = (
+            b'Content-Type: text/plain; charset="utf-8"\r\n'
+            b"MIME-Version: 1.0\r\n"
+            b"Content-Transfer-Encoding: base64\r\n\r\n"
+        )
+
+        # Final del correo: delimitadores y adjuntos, como trozos independientes
+        separator = b"\r\n--" + boundary + b"\r\n"
+        self._tail = []
+        for path in attachments:
+            self._tail += [separator, get_attachment(path).part]
+        self._tail.append(b"\r\n--" + boundary + b"--\r\n")
+
+    def _encode_body(self, body):
+        """Devuelve las cabeceras y el contenido de la parte de texto"""
+        if body.isascii():
+            data = body.replace("\r\n", "\n").replace("\n", "\r\n").encode('ascii')
+            # Texto ASCII con líneas cortas: se envía tal cual, sin codificar
+            if (self._boundary not in data
+                    and all(len(line) <= MAX_LINE_LENGTH for line in data.split(b"\r\n"))):
+                return self._text_7bit, data
+        return self._text_base64, encode_base64_lines(body.encode('utf-8')).rstrip(b"\r\n")
+
+    def build_parts(self, recipient, body):
+        """Devuelve el correo como lista de trozos de bytes listos para DATA.
+
+        Los trozos ya llevan duplicados los puntos iniciales de línea, de
+        modo que pueden enviarse tal cual por el socket: los adjuntos se
+        transmiten desde la caché compartida sin copiarse por cada correo.
+        """
+        text_headers, data = self._encode_body(body)
+        if text_headers is self._text_7bit:
+            data = quote_periods(data)  # base64 nunca empieza línea con punto
+        return [self._head, _recipient_bytes(recipient), self._after_to,
+                text_headers, data, *self._tail]
+
+    def build(self, recipient, body):
+        """Devuelve los bytes del correo para ``recipient`` con el cuerpo ``body``"""
+        text_headers, data = self._encode_body(body)
+        return b"".join((
+            self._head, _recipient_bytes(recipient), self._after_to,
+            text_headers, data, *self._tail,
+        ))
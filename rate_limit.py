@@ -0,0 +1,163 @@
+"""Limitación de velocidad de envío según el proveedor de correo.
+
+Cada proveedor impone límites de envío por minuto y por día. El planificador
+reparte los envíos con un token bucket ajustado al límite por minuto, lleva
+la cuenta del límite diario y frena automáticamente cuando el servidor
+responde con códigos de saturación temporal (421/450/452).
+"""
+import threading
+import time
+
+# Límites conservadores de cada proveedor (correos por minuto / por día)
+PROVIDER_LIMITS = {
+    'Gmail': {'por_minuto': 20, 'por_dia': 500},
+    'Outlook': {'por_minuto': 30, 'por_dia': 300},
+    'Yahoo': {'por_minuto': 20, 'por_dia': 500},
+    'Office365': {'por_minuto': 30, 'por_dia': 10000},
+}
+
+# Servidores SMTP conocidos de cada proveedor
+PROVIDER_SERVERS = {
+    'smtp.gmail.com': 'Gmail',
+    'smtp-mail.outlook.com': 'Outlook',
+    'smtp.mail.yahoo.com': 'Yahoo',
+    'smtp.office365.com': 'Office365',
+}
+
+# Respuestas SMTP que indican saturación temporal: el correo debe aplazarse
+THROTTLE_CODES = (421, 450, 452)
+
+# Espera inicial y máxima tras una respuesta de saturación (segundos)
+BACKOFF_BASE = 30
+BACKOFF_MAX = 15 * 60
+
+
+class DailyLimitReached(Exception):
+    """Se alcanzó el límite diario de envíos del proveedor"""
+
+
+def provider_limits(provider, servidor=''):
+    """Devuelve los límites del proveedor o None si no se conocen"""
+    if provider not in PROVIDER_LIMITS:
+        provider = PROVIDER_SERVERS.get(servidor.strip().lower())
+    return PROVIDER_LIMITS.get(provider)
+
+
+def is_throttle_error(error):
+    """Indica si una excepción SMTP corresponde a una saturación temporal"""
+    code = getattr(error, 'smtp_code', None)
+    if code is None:
+        # SMTPRecipientsRefused guarda los códigos por destinatario
+        recipients = getattr(error, 'recipients', None) or {}
+        codes = [code for code, _ in recipients.values()]
+        return bool(codes) and all(code in THROTTLE_CODES for code in codes)
+    return code in THROTTLE_CODES
+
+
+class TokenBucket:
+    """Token bucket thread-safe: ``rate`` tokens por segundo hasta ``capacity``"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """Consume un token si hay; si no, devuelve los segundos a esperar"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+
+class ThrottleScheduler:
+    """Planificador de envíos con límites de proveedor y frenado adaptativo.
+
+    Los hilos de envío llaman a :meth:`acquire` antes de cada correo y a
+    :meth:`record_success` o :meth:`record_throttle` según la respuesta del
+    servidor. Tras una saturación se pausa el envío con espera exponencial y
+    se reduce la velocidad a la mitad; los envíos correctos la van
+    recuperando hasta el límite nominal.
+    """
+
+    def __init__(self, por_minuto=None, por_dia=None):
+        self.por_dia = por_dia
+        if por_minuto is None:
+            # Sin límite conocido: solo se aplica el frenado ante saturaciones
+            self.nominal_rate = None
+            self.bucket = None
+        else:
+            self.nominal_rate = por_minuto / 60
+            # Capacidad pequeña: evita ráfagas al comienzo de cada minuto
+            self.bucket = TokenBucket(self.nominal_rate, capacity=max(1, por_minuto // 10))
+        self.sent_today = 0
+        self._throttles = 0
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_provider(cls, provider, servidor=''):
+        """Crea el planificador con los límites del proveedor, si se conocen"""
+        limits = provider_limits(provider, servidor)
+        if limits is None:
+            return cls()
+        return cls(limits['por_minuto'], limits['por_dia'])
+
+    def acquire(self, cancelled):
+        """Espera el turno del próximo envío.
+
+        ``cancelled`` es un ``threading.Event``; devuelve False si se activó
+        durante la espera. Lanza :class:`DailyLimitReached` si ya no quedan
+        envíos disponibles hoy.
+        """
+        while not cancelled.is_set():
+            with self._lock:
+                if self.por_dia is not None and self.sent_today >= self.por_dia:
+                    raise DailyLimitReached(
+                        f"Límite diario de {self.por_dia} correos alcanzado"
+                    )
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0:
+                    wait = self.bucket.try_acquire() if self.bucket is not None else 0
+                    if wait == 0:
+                        self.sent_today += 1
+                        return True
+            cancelled.wait(wait)
+        return False
+
+    def paused_for(self):
+        """Segundos que faltan para que termine la pausa por saturación (0 si no hay)"""
+        with self._lock:
+            return max(0.0, self._paused_until - time.monotonic())
+
+    def record_success(self):
+        """Recupera velocidad gradualmente tras un envío correcto"""
+        with self._lock:
+            self._throttles = 0
+            if self.bucket is not None:
+                self.bucket.rate = min(self.nominal_rate, self.bucket.rate * 1.05)
+
+    def record_throttle(self):
+        """Frena tras una saturación; devuelve los segundos de pausa aplicados"""
+        with self._lock:
+            # El correo aplazado no cuenta para el límite diario
+            self.sent_today = max(0, self.sent_today - 1)
+            now = time.monotonic()
+            if now < self._paused_until:
+                # Otro hilo ya aplicó la pausa por esta misma saturación
+                return self._paused_until - now
+
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** self._throttles)
+            self._throttles += 1
+            self._paused_until = now + delay
+            if self.bucket is not None:
+                self.bucket.rate = max(self.nominal_rate / 16, self.bucket.rate / 2)
+            return delay
@@ -0,0 +1,162 @@
+"""Validación y depuración de destinatarios antes del envío.
+
+Trabaja sobre la columna completa de emails a la vez: normaliza mayúsculas
+y espacios, comprueba la sintaxis, elimina duplicados y detecta filas a las
+que les faltan datos que usa la plantilla. Solo las filas limpias llegan al
+servidor SMTP.
+"""
+import pandas as pd
+
+# Sintaxis razonable de una dirección: usuario@dominio.tld, sin espacios. El
+# usuario es un dot-atom (RFC 5322): sin puntos al inicio, al final ni dobles
+EMAIL_PATTERN = r"^[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*@[A-Za-z0-9](?:[A-Za-z0-9-]*[A-Za-z0-9])?(?:\.[A-Za-z0-9](?:[A-Za-z0-9-]*[A-Za-z0-9])?)+$"
+
+
+class ValidationReport:
+    """Resultado de la validación: filas limpias y motivos de descarte"""
+
+    def __init__(self, total, clean, empty, invalid, duplicated, missing_fields):
+        self.total = total
+        self.clean = clean  # DataFrame con las filas que se enviarán
+        self.empty = empty  # Índices sin email
+        self.invalid = invalid  # Índices con email mal formado
+        self.duplicated = duplicated  # Índices con email repetido
+        self.missing_fields = missing_fields  # {columna: índices sin dato}
+
+    @property
+    def discarded(self):
+        return self.total - len(self.clean)
+
+    def summary(self):
+        """Líneas de texto con el resumen para el registro de envío"""
+        return _summary(self.total, len(self.clean), len(self.empty), len(self.invalid),
+                        len(self.duplicated),
+                        {col: len(rows) for col, rows in self.missing_fields.items()})
+
+
+def _summary(total, ready, empty, invalid, duplicated, missing_fields):
+    lines = [
+        f"Destinatarios: {total}",
+        f"- Listos para enviar: {ready}",
+    ]
+    if empty:
+        lines.append(f"- Sin email: {empty}")
+    if invalid:
+        lines.append(f"- Email inválido: {invalid}")
+    if duplicated:
+        lines.append(f"- Email duplicado: {duplicated}")
+    for col, count in missing_fields.items():
+        lines.append(f"- Sin dato en {{{col}}}: {count}")
+    return lines
+
+
+def normalize_emails(emails):
+    """Quita espacios (incluidos los no separables) y pasa a minúsculas"""
+    return (
+        emails.astype('string')
+        .str.replace('\xa0', ' ', regex=False)
+        .str.strip()
+        .str.lower()
+    )
+
+
+def validate_recipients(df, email_column, required_columns=(), seen=None):
+    """Valida y depura los destinatarios de ``df``.
+
+    Devuelve un :class:`ValidationReport` cuyo ``clean`` conserva el índice
+    original de las filas aceptadas, con la columna de email normalizada.
+    Las filas sin dato en alguna de ``required_columns`` se descartan antes
+    de buscar duplicados, de modo que se envía la primera fila completa de
+    cada dirección.
+
+    ``seen`` es un conjunto opcional con los emails ya aceptados en bloques
+    anteriores: cuentan como duplicados y se amplía con los de ``df``.
+    """
+    emails = normalize_emails(df[email_column])
+
+    empty = emails.isna() | (emails == '')
+    empty = empty.fillna(True).astype(bool)
+    valid = emails.str.match(EMAIL_PATTERN).fillna(False).astype(bool)
+    invalid = ~empty & ~valid
+
+    # Las filas a las que les falta un dato de la plantilla no se envían,
+    # así que se descartan antes de buscar duplicados
+    missing = pd.Series(False, index=df.index)
+    missing_fields = {}
+    for col in required_columns:
+        if col == email_column:
+            continue
+        absent = df[col].isna() & valid
+        if absent.any():
+            missing_fields[str(col)] = df.index[absent.to_numpy()]
+            missing |= absent
+    complete = valid & ~missing
+
+    # Solo cuenta como duplicado la segunda aparición de un email completo
+    repeated = emails.where(complete).duplicated(keep='first')
+    if seen:
+        # Consulta directa al conjunto: el coste depende del bloque, no de
+        # cuántos emails se vieron antes
+        previous = pd.Series(False, index=df.index)
+        previous[complete] = [email in seen for email in emails[complete].tolist()]
+        repeated |= previous
+    duplicated = complete & repeated
+    if seen is not None:
+        seen.update(emails[complete].tolist())
+
+    keep = complete & ~duplicated
+    clean = df[keep.to_numpy()].copy()
+    clean[email_column] = emails[keep]
+
+    return ValidationReport(
+        total=len(df),
+        clean=clean,
+        empty=df.index[empty.to_numpy()],
+        invalid=df.index[invalid.to_numpy()],
+        duplicated=df.index[duplicated.to_numpy()],
+        missing_fields=missing_fields,
+    )
+
+
+class RecipientStream:
+    """Valida los destinatarios bloque a bloque mientras se lee el archivo.
+
+    Al iterarla genera, por cada bloque de ``chunks``, el DataFrame con sus
+    filas limpias; un email ya visto en un bloque anterior cuenta como
+    duplicado. Los recuentos se acumulan a medida que avanza la lectura, de
+    modo que :meth:`summary` solo está completo al terminar.
+    """
+
+    def __init__(self, chunks, email_column, required_columns=()):
+        self.chunks = chunks
+        self.email_column = email_column
+        self.required_columns = list(required_columns)
+        self.total = 0
+        self.ready = 0
+        self.empty = 0
+        self.invalid = 0
+        self.duplicated = 0
+        self.missing_fields = {}  # {columna: filas sin dato}
+
+    def __iter__(self):
+        seen = set()
+        for chunk in self.chunks:
+            report = validate_recipients(chunk, self.email_column, self.required_columns, seen)
+            self.total += report.total
+            self.ready += len(report.clean)
+            self.empty += len(report.empty)
+            self.invalid += len(report.invalid)
+            self.duplicated += len(report.duplicated)
+            for col, rows in report.missing_fields.items():
+                self.missing_fields[col] = self.missing_fields.get(col, 0) + len(rows)
+            if len(report.clean):
+                yield report.clean
+
+    @property
+    def discarded(self):
+        return self.total - self.ready
+
+    def summary(self):
+        """Líneas de texto con el resumen de lo validado hasta ahora"""
+        return _summary(self.total, self.ready, self.empty, self.invalid,
+                        self.duplicated, self.missing_fields)
@@ -0,0 +1,602 @@
+"""Motor de envío de correos en segundo plano.
+
+El envío se ejecuta en un hilo independiente del bucle principal de Tk. El
+progreso se comunica a la interfaz mediante una cola thread-safe que la
+ventana vacía periódicamente, de modo que la velocidad de envío depende solo
+del servidor SMTP y no de los redibujados de la interfaz.
+"""
+import queue
+import smtplib
+import socket
+import threading
+
+import numpy as np
+import pandas as pd
+
+from campaign_journal import FAILED, SENT
+from metrics import SendMetrics
+from mime_factory import MessageFactory
+from rate_limit import DailyLimitReached, is_throttle_error
+from sender_accounts import SenderAccount
+
+
+# Segundos que puede tardar una operación de red antes de dar la conexión por caída
+SMTP_TIMEOUT = 60
+
+
+def open_smtp_connection(smtp_config):
+    """Abre y autentica una conexión SMTP según la configuración dada.
+
+    ``smtp_config['starttls']`` (True por omisión) solo debe desactivarse para
+    servidores locales de prueba como :mod:`smtp_sink`. Un servidor que deja
+    de responder más de :data:`SMTP_TIMEOUT` segundos provoca ``TimeoutError``
+    y el hilo reconecta en lugar de quedarse bloqueado.
+    """
+    if smtp_config['puerto'] == 465:
+        server = smtplib.SMTP_SSL(smtp_config['servidor'], smtp_config['puerto'],
+                                  timeout=SMTP_TIMEOUT)
+    else:
+        server = smtplib.SMTP(smtp_config['servidor'], smtp_config['puerto'],
+                              timeout=SMTP_TIMEOUT)
+        if smtp_config.get('starttls', True):
+            server.starttls()
+
+    # Envía cada escritura sin esperar al ACK de la anterior
+    server.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    server.login(smtp_config['email'], smtp_config['password'])
+    return server
+
+
+def _reset_or_close(server, code):
+    """Tras un rechazo, deja la conexión lista para el siguiente correo"""
+    if code == 421:
+        server.close()  # El servidor cerró la sesión
+    else:
+        try:
+            server.rset()
+        except smtplib.SMTPServerDisconnected:
+            pass
+
+
+# Los trozos menores que esto se agrupan antes de escribirlos en el socket
+COALESCE_BYTES = 64 * 1024
+
+
+def send_parts(server, sender, recipient, parts):
+    """Envía un correo formado por trozos de bytes ya preparados para DATA.
+
+    Equivale a ``server.sendmail`` para un único destinatario, pero escribe
+    cada trozo directamente en el socket en lugar de concatenarlos y volver a
+    recorrer el mensaje completo: los adjuntos compartidos no se copian por
+    cada correo. Los trozos deben llevar ya duplicados los puntos iniciales
+    de línea (ver :meth:`mime_factory.MessageFactory.build_parts`). Lanza las
+    mismas excepciones que ``sendmail``.
+    """
+    server.ehlo_or_helo_if_needed()
+
+    code, resp = server.mail(sender)
+    if code != 250:
+        _reset_or_close(server, code)
+        raise smtplib.SMTPSenderRefused(code, resp, sender)
+
+    code, resp = server.rcpt(recipient)
+    if code not in (250, 251):
+        _reset_or_close(server, code)
+        raise smtplib.SMTPRecipientsRefused({recipient: (code, resp)})
+
+    code, resp = server.docmd('data')
+    if code != 354:
+        _reset_or_close(server, code)
+        raise smtplib.SMTPDataError(code, resp)
+
+    # Agrupa los trozos pequeños en una sola escritura: varias escrituras
+    # cortas seguidas chocan con el algoritmo de Nagle y el ACK retardado
+    # del servidor (unos 40 ms de espera por correo)
+    pending = []
+    for part in parts:
+        if len(part) < COALESCE_BYTES:
+            pending.append(part)
+            continue
+        if pending:
+            server.send(b"".join(pending))
+            pending = []
+        server.send(part)
+    pending.append(b".\r\n")
+    server.send(b"".join(pending))
+
+    code, resp = server.getreply()
+    if code != 250:
+        _reset_or_close(server, code)
+        raise smtplib.SMTPDataError(code, resp)
+
+
+# Errores de red tras los que conviene reconectar y reintentar el correo
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+MAX_RECONNECTS = 3
+
+# Veces que se reintenta un correo aplazado por saturación del servidor
+MAX_DEFERRALS = 5
+
+# Cada cuántos segundos se guarda en disco el estado de la campaña
+CHECKPOINT_SECONDS = 2
+
+
+class SendEngine(threading.Thread):
+    """Hilo coordinador que realiza el envío masivo de correos.
+
+    ``accounts`` es la configuración SMTP de una cuenta o una lista de
+    cuentas (ver :mod:`sender_accounts`). Cada cuenta abre
+    ``conexiones`` hilos, cada uno con su propia conexión SMTP autenticada, y
+    todos toman las filas de una cola común. Si una conexión se cae, el hilo
+    correspondiente vuelve a conectar e iniciar sesión antes de reintentar el
+    correo. El ritmo de cada cuenta lo marca su
+    :class:`~rate_limit.ThrottleScheduler` con los límites del proveedor; los
+    correos rechazados por saturación se aplazan y se reenvían al final.
+
+    Con varias cuentas, una cuenta saturada deja sus correos a las demás
+    mientras dura su pausa, y una cuenta sin cupo diario deja de enviar sin
+    detener la campaña; el envío se detiene solo cuando ninguna tiene cupo.
+
+    Publica eventos ``(tipo, datos)`` en ``self.events``:
+
+    - ``('log', mensaje)``: línea para el registro de eventos
+    - ``('progreso', (enviados, total))``: avance del envío; ``total`` es
+      None mientras se siguen leyendo filas del archivo
+    - ``('estado', 'pausado' | 'reanudado' | 'cancelando')``
+    - ``('fin', (correctos, fallidos, cancelado))``: el envío terminó
+    - ``('error', mensaje)``: error global que detuvo el envío
+
+    Los tiempos de cada etapa y los contadores se acumulan en
+    ``self.metrics`` (:class:`~metrics.SendMetrics`), que la interfaz puede
+    consultar en cualquier momento.
+    """
+
+    def __init__(self, accounts, source, column_mapping, template, total=None,
+                 journal=None, resume=False, audit_log=None, attachments=(), metrics=None,
+                 quotas=None):
+        super().__init__(daemon=True)
+        if isinstance(accounts, dict):
+            accounts = [accounts]
+        # Cupos del día por cuenta: QuotaStore opcional
+        self.quotas = quotas
+        self.accounts = [
+            SenderAccount(config, quotas.sent_today(config['email']) if quotas else 0)
+            for config in accounts
+        ]
+        if not self.accounts:
+            raise ValueError("Se necesita al menos una cuenta de envío")
+        # Origen de las filas: un DataFrame o un iterable de bloques (DataFrame)
+        if isinstance(source, pd.DataFrame):
+            source, total = [source], len(source)
+        self.source = source
+        self.total = total  # None mientras no se conozca el número de filas
+        self.column_mapping = dict(column_mapping)
+        self.template = template  # CompiledTemplate del mensaje
+        self.journal = journal  # CampaignJournal opcional
+        # Omite las filas ya entregadas según el registro de la campaña
+        self.skip_delivered = resume and journal is not None
+        self.audit_log = audit_log  # AuditLog opcional (registro en disco)
+        self.attachments = list(attachments)
+        self.metrics = metrics if metrics is not None else SendMetrics()
+        self.metrics.total = self.total
+        self.events = queue.Queue()
+
+        # _running activo = enviando; inactivo = en pausa
+        self._running = threading.Event()
+        self._running.set()
+        self._cancelled = threading.Event()
+        # Activo cuando ya no quedan trabajos: libera a los hilos en espera
+        self._stopping = threading.Event()
+
+        # Contadores compartidos por los hilos del grupo
+        self._lock = threading.Lock()
+        self.success_count = 0
+        self.failure_count = 0
+        self.processed = 0
+        self.skipped_count = 0
+
+        # Trabajos aplazados por saturación y veces que se aplazó cada fila
+        self._deferred = []
+        self._deferrals = {}
+
+        # Primer error de un hilo de conexión que obliga a detener el envío
+        self._error = None
+        # Envíos de hoy por cuenta según el último guardado del cupo diario
+        self._saved_quotas = None
+
+    def pause(self):
+        """Pausa el envío tras los correos en curso"""
+        if self._running.is_set():
+            self._running.clear()
+            self.events.put(('estado', 'pausado'))
+
+    def resume(self):
+        """Reanuda un envío pausado"""
+        if not self._running.is_set():
+            self._running.set()
+            self.events.put(('estado', 'reanudado'))
+
+    def cancel(self):
+        """Cancela el envío tras los correos en curso"""
+        self._cancelled.set()
+        # Libera los hilos si estaban en pausa para que puedan terminar
+        self._running.set()
+        self.events.put(('estado', 'cancelando'))
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def _wait_if_paused(self):
+        """Bloquea mientras el envío esté en pausa; devuelve False si se canceló"""
+        self._running.wait()
+        return not self._cancelled.is_set()
+
+    def _connect(self, account):
+        """Abre una conexión SMTP midiendo el tiempo de conexión y login"""
+        with self.metrics.timer('conexion'):
+            return open_smtp_connection(account.config)
+
+    def _open_pool(self):
+        """Abre las conexiones de todas las cuentas.
+
+        Devuelve una lista de ``(cuenta, conexión)``. Una cuenta sin ninguna
+        conexión queda fuera del envío; falla solo si no se pudo abrir
+        ninguna conexión en ninguna cuenta.
+        """
+        connections = []
+        error = None
+        for account in self.accounts:
+            opened = 0
+            for n in range(account.pool_size):
+                try:
+                    connections.append((account, self._connect(account)))
+                    opened += 1
+                except Exception as e:
+                    error = e
+                    if not opened:
+                        break  # Si la primera falla, la cuenta no está disponible
+                    self.events.put(('log', f"Conexión {n + 1} de {account} no disponible: {str(e)}"))
+
+            if not opened:
+                account.disabled = str(error)
+                self.events.put(('log', f"⚠ Cuenta {account} no disponible: {str(error)}"))
+            elif opened < account.pool_size:
+                self.events.put(('log', f"{account}: enviando con {opened} de {account.pool_size} conexiones"))
+
+        if not connections:
+            raise error
+        return connections
+
+    def _send(self, account, server, email, msg):
+        """Envía un correo reconectando si la conexión se cayó.
+
+        Devuelve la conexión (posiblemente nueva) que debe seguir usando el hilo.
+        """
+        for attempt in range(MAX_RECONNECTS + 1):
+            try:
+                if server is None:
+                    server = self._connect(account)
+                    self.metrics.count('reconexiones')
+                    self.events.put(('log', "Conexión SMTP restablecida"))
+                with self.metrics.timer('smtp'):
+                    send_parts(server, account.email, email, msg)
+                return server
+            except RECONNECT_ERRORS:
+                if server is not None:
+                    _close_quietly(server)
+                server = None
+                if attempt == MAX_RECONNECTS:
+                    raise
+
+    def _other_account_ready(self, account):
+        """Indica si otra cuenta puede enviar ahora mismo"""
+        return any(other is not account and other.ready() for other in self.accounts)
+
+    def _defer(self, job, counted=True):
+        """Deja un trabajo para la siguiente ronda de reenvíos"""
+        index = job[0]
+        with self._lock:
+            if counted:
+                self._deferrals[index] = self._deferrals.get(index, 0) + 1
+            self._deferred.append(job)
+
+    def _account_exhausted(self, account, job, error):
+        """Retira una cuenta sin cupo; si era la última, detiene el envío"""
+        with self._lock:
+            account.disabled = str(error)
+            remaining = [other for other in self.accounts if other.available]
+        if remaining:
+            # Otra cuenta enviará este correo en la siguiente ronda
+            self._defer(job, counted=False)
+            self.events.put(('log', f"⚠ {account}: {str(error)}. "
+                                    f"El envío sigue con {len(remaining)} cuenta(s)."))
+        else:
+            # Sin cupo en ninguna cuenta: las filas restantes quedan sin enviar
+            self.events.put(('log', f"⚠ {str(error)}. Envío detenido."))
+            self._cancelled.set()
+
+    def _process(self, account, server, job):
+        """Envía el correo de un trabajo; devuelve la conexión a seguir usando"""
+        index, email, body = job
+        if not account.ready() and self._other_account_ready(account):
+            # Cuenta en pausa por saturación: otra cuenta se encarga del correo
+            self._defer(job, counted=False)
+            return server
+
+        try:
+            with self.metrics.timer('espera'):
+                acquired = account.scheduler.acquire(self._cancelled)
+            if not acquired:
+                return server  # Cancelado durante la espera
+            with self.metrics.timer('mime'):
+                msg = account.messages.build_parts(email, body)
+            server = self._send(account, server, email, msg)
+        except DailyLimitReached as e:
+            self._account_exhausted(account, job, e)
+            return server
+        except Exception as e:
+            if is_throttle_error(e) and self._deferrals.get(index, 0) < MAX_DEFERRALS:
+                delay = account.scheduler.record_throttle()
+                self._defer(job)
+                self.metrics.count('aplazados')
+                self.events.put(('log', f"⏸ Aplazado {email} ({str(e)}); "
+                                        f"pausa de {delay:.0f} s en {account}"))
+                if self.audit_log is not None:
+                    self.audit_log.recipient(index, email, 'aplazado', str(e), account.email)
+                return server
+            self._record(account, job, False, str(e))
+            self.events.put(('log', f"✗ Error con {email}: {str(e)}"))
+            return server
+
+        account.scheduler.record_success()
+        self._record(account, job, True)
+        self.events.put(('log', f"✓ Enviado a {email}"))
+        return server
+
+    def _record(self, account, job, ok, detail=''):
+        """Anota el resultado, actualiza los contadores y publica el avance"""
+        index, email, _ = job
+        status = SENT if ok else FAILED
+        with self.metrics.timer('registro'):
+            if self.journal is not None:
+                self.journal.record(index, email, status, detail)
+            if self.audit_log is not None:
+                self.audit_log.recipient(index, email, status, detail, account.email)
+        self.metrics.count('enviados' if ok else 'fallidos')
+        if ok:
+            self.metrics.count_sender(account.email)
+
+        with self._lock:
+            if ok:
+                self.success_count += 1
+            else:
+                self.failure_count += 1
+            self.processed += 1
+            processed = self.processed
+        self.events.put(('progreso', (processed, self.total)))
+
+    def _abort(self, error):
+        """Detiene el envío por un error de un hilo; ``run`` lo informa como global"""
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._cancelled.set()
+        self._running.set()
+
+    def _rest(self, account):
+        """Mientras la cuenta esté en pausa y otra pueda enviar, espera sin tomar trabajos"""
+        while not (self._cancelled.is_set() or self._stopping.is_set()):
+            wait = account.scheduler.paused_for()
+            if wait <= 0 or not self._other_account_ready(account):
+                return
+            self._stopping.wait(min(wait, 1))
+
+    def _worker(self, account, server, jobs):
+        """Consume trabajos de la cola con una conexión propia de ``account``"""
+        while True:
+            job = jobs.get()
+            try:
+                if job is None:
+                    break
+                if self._wait_if_paused():
+                    try:
+                        server = self._process(account, server, job)
+                    except Exception as e:
+                        # Fallo ajeno al correo (p. ej. disco lleno al anotar
+                        # el resultado): el resto de la cola se descarta
+                        self._abort(e)
+                # Si se canceló, descarta el resto de la cola
+            finally:
+                jobs.task_done()
+
+            if not account.available and not self._cancelled.is_set():
+                break  # Cuenta sin cupo: las demás siguen con la cola
+            self._rest(account)
+
+        if server is not None:
+            _close_quietly(server)
+
+    def _checkpoint(self):
+        """Vuelca el registro y el cupo diario periódicamente, aunque no lleguen resultados nuevos"""
+        while not self._stopping.wait(CHECKPOINT_SECONDS):
+            try:
+                if self.journal is not None:
+                    self.journal.flush_if_due()
+            except Exception as e:
+                self._abort(e)
+                return
+            self.save_quotas()
+
+    def _iter_jobs(self):
+        """Genera los trabajos ``(fila, email, mensaje)`` bloque a bloque.
+
+        ``fila`` es la etiqueta del índice del DataFrame, que identifica la
+        fila en el archivo original aunque se hayan descartado otras.
+        """
+        delivered = None
+        if self.skip_delivered:
+            delivered = np.fromiter(self.journal.delivered_rows(), dtype=np.int64)
+            self.events.put(('log', f"Reanudando: {len(delivered)} correos ya enviados se omitirán"))
+
+        count = 0
+        chunks = iter(self.source)
+        while True:
+            # Con un iterador de bloques, la lectura del archivo ocurre aquí
+            with self.metrics.timer('carga'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            # El índice del DataFrame identifica la fila en el archivo original
+            indices = chunk.index.to_numpy()
+            count += len(chunk)
+
+            if delivered is not None and len(delivered):
+                # Descarta las filas ya entregadas antes de personalizarlas
+                pending = ~np.isin(indices, delivered)
+                skipped = len(indices) - int(pending.sum())
+                if skipped:
+                    chunk, indices = chunk[pending], indices[pending]
+                    with self._lock:
+                        self.skipped_count += skipped
+                        self.processed += skipped
+                    self.metrics.count('omitidos', skipped)
+
+            # Personaliza todos los mensajes del bloque de una vez, por columnas
+            with self.metrics.timer('personalizacion'):
+                bodies = self.template.render_frame(chunk)
+            emails = chunk[self.column_mapping['email']].tolist()
+            yield from zip(indices.tolist(), emails, bodies)
+
+        if self.total is None:
+            self.total = self.metrics.total = count
+
+    def _audit_event(self, text, **data):
+        if self.audit_log is not None:
+            self.audit_log.event(text, **data)
+
+    def _dispatch(self, jobs):
+        """Reparte los trabajos entre las conexiones hasta agotarlos"""
+        pending = self._iter_jobs()
+        while True:
+            for job in pending:
+                if self._cancelled.is_set():
+                    break
+                jobs.put(job)
+            jobs.join()
+
+            # Reenvía los correos aplazados por saturación del servidor
+            with self._lock:
+                pending, self._deferred = self._deferred, []
+            if not pending or self._cancelled.is_set():
+                break
+            self.events.put(('log', f"Reintentando {len(pending)} correos aplazados"))
+
+    def run(self):
+        """Realiza el envío masivo de correos"""
+        self.events.put(('log', "=== INICIANDO ENVÍO DE CORREOS ==="))
+        senders = [account.email for account in self.accounts]
+        self._audit_event('inicio', remitente=", ".join(senders), reanudado=self.skip_delivered)
+        if len(self.accounts) > 1:
+            self.events.put(('log', f"Repartiendo el envío entre {len(self.accounts)} cuentas"))
+
+        try:
+            # Cabeceras y adjuntos se codifican una sola vez por campaña y
+            # cuenta; los adjuntos se comparten entre todas las cuentas
+            for account in self.accounts:
+                account.messages = MessageFactory(account.email, attachments=self.attachments)
+
+            connections = self._open_pool()
+
+            # Cola acotada: evita recorrer todo el DataFrame de golpe
+            jobs = queue.Queue(maxsize=len(connections) * 4)
+            workers = [
+                threading.Thread(target=self._worker, args=(account, server, jobs), daemon=True)
+                for account, server in connections
+            ]
+            for worker in workers:
+                worker.start()
+            # Volcado periódico del registro mientras haya hilos enviando
+            checkpoint = threading.Thread(target=self._checkpoint, daemon=True)
+            checkpoint.start()
+
+            try:
+                self._dispatch(jobs)
+            except BaseException:
+                # Los hilos descartan lo que quede en la cola
+                self._cancelled.set()
+                self._running.set()
+                raise
+            finally:
+                # Detiene los hilos y cierra sus conexiones aunque el reparto falle
+                self._stopping.set()
+                for _ in workers:
+                    jobs.put(None)
+                for worker in workers:
+                    worker.join()
+                checkpoint.join()
+
+            if self._error is not None:
+                raise self._error
+            cancelled = self._cancelled.is_set()
+
+            if cancelled:
+                self.events.put(('log', "=== ENVÍO CANCELADO ==="))
+            else:
+                self.events.put(('log', "=== ENVÍO COMPLETADO ==="))
+            self.events.put(('log', f"Correctos: {self.success_count}, Fallidos: {self.failure_count}"))
+            if self.skipped_count:
+                self.events.put(('log', f"Omitidos (ya enviados antes): {self.skipped_count}"))
+            self._audit_event('cancelado' if cancelled else 'completado',
+                              correctos=self.success_count, fallidos=self.failure_count,
+                              omitidos=self.skipped_count)
+            self.metrics.finish()
+            self.save_quotas()
+            self.events.put(('fin', (self.success_count, self.failure_count, cancelled)))
+
+        except Exception as e:
+            # Detiene los hilos que sigan trabajando
+            self._cancelled.set()
+            self._running.set()
+            self.events.put(('log', f"ERROR GLOBAL: {str(e)}"))
+            self._audit_event('error', detalle=str(e))
+            self.metrics.finish()
+            self.save_quotas()
+            self.events.put(('error', str(e)))
+
+        finally:
+            # Deja constancia en disco de todo lo enviado hasta ahora
+            if self.journal is not None:
+                try:
+                    self.journal.flush()
+                except Exception as e:
+                    self.events.put(('log', f"No se pudo guardar el registro de la campaña: {str(e)}"))
+
+    def save_quotas(self):
+        """Guarda los envíos de hoy de cada cuenta para las próximas campañas.
+
+        Se llama periódicamente durante el envío y al terminar; solo escribe
+        si los contadores cambiaron desde la última vez.
+        """
+        if self.quotas is None:
+            return
+        counts = {account.email: account.scheduler.sent_today for account in self.accounts}
+        if counts == self._saved_quotas:
+            return
+        try:
+            self.quotas.save(counts)
+            self._saved_quotas = counts
+        except OSError as e:
+            self.events.put(('log', f"No se pudo guardar el cupo diario: {str(e)}"))
+
+
+def _close_quietly(server):
+    """Cierra una conexión SMTP ignorando errores"""
+    try:
+        server.quit()
+    except Exception:
+        try:
+            server.close()
+        except Exception:
+            pass
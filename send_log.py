@@ -0,0 +1,56 @@
+"""Registro en disco de cada envío, para auditoría.
+
+Cada destinatario procesado se anota como una línea JSON (JSONL) en un
+archivo que rota al alcanzar ``MAX_BYTES``, conservando ``BACKUP_COUNT``
+archivos anteriores. La escritura pasa por ``logging``, que es seguro
+desde varios hilos.
+"""
+import json
+import logging
+import os
+import time
+from logging.handlers import RotatingFileHandler
+
+from app_paths import APP_DIR
+
+LOG_DIR = os.path.join(APP_DIR, 'registros')
+LOG_FILE = 'envios.jsonl'
+MAX_BYTES = 10 * 1024 * 1024
+BACKUP_COUNT = 5
+
+
+class AuditLog:
+    """Archivo JSONL rotativo con una línea por destinatario y por evento de campaña"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(LOG_DIR, LOG_FILE)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._handler = RotatingFileHandler(
+            self.path, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding='utf-8'
+        )
+        self._handler.setFormatter(logging.Formatter('%(message)s'))
+        # Un logger propio por archivo, sin propagar al logger raíz
+        self._logger = logging.getLogger(f"{__name__}.{self.path}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(self._handler)
+
+    def _write(self, record):
+        record = {'fecha': time.strftime('%Y-%m-%d %H:%M:%S'), **record}
+        self._logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+    def recipient(self, index, email, status, detail='', account=None):
+        """Anota el resultado del envío a un destinatario y la cuenta que lo envió"""
+        record = {'fila': index, 'email': email, 'estado': status, 'detalle': detail}
+        if account is not None:
+            record['cuenta'] = account
+        self._write(record)
+
+    def event(self, text, **data):
+        """Anota un evento general de la campaña (inicio, fin, errores)"""
+        self._write({'evento': text, **data})
+
+    def close(self):
+        self._logger.removeHandler(self._handler)
+        self._handler.close()
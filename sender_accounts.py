@@ -0,0 +1,91 @@
+"""Cuentas de envío (remitentes) de una campaña y su cupo diario.
+
+Una campaña puede repartirse entre varias cuentas para superar el límite
+diario de un solo buzón. Cada cuenta tiene su propio planificador
+(:class:`~rate_limit.ThrottleScheduler`), sus propias conexiones y su propio
+remitente; el motor de envío las alimenta desde una cola común, de modo que
+la velocidad total crece con el número de cuentas.
+
+Los envíos de cada cuenta se anotan por día en ``QUOTA_FILE``
+(:class:`QuotaStore`), para que el cupo diario se respete también entre
+varias campañas del mismo día.
+"""
+import datetime
+import json
+import os
+
+from app_paths import APP_DIR
+from rate_limit import ThrottleScheduler, provider_limits
+
+QUOTA_FILE = os.path.join(APP_DIR, 'cuotas.json')
+
+
+def account_label(config):
+    """Texto breve de una cuenta para listas y registros"""
+    return f"{config['email']} ({config['servidor']}, {config.get('conexiones', 1)} conexiones)"
+
+
+class QuotaStore:
+    """Correos enviados hoy por cada cuenta, guardados en un archivo JSON"""
+
+    def __init__(self, path=QUOTA_FILE):
+        self.path = path
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Un día nuevo empieza con todos los cupos libres
+        if data.get('fecha') != datetime.date.today().isoformat():
+            return {}
+        return data.get('enviados', {})
+
+    def sent_today(self, email):
+        return int(self._read().get(email, 0))
+
+    def save(self, counts):
+        """Actualiza los envíos de hoy de las cuentas dadas (``{email: enviados}``)"""
+        sent = self._read()
+        sent.update(counts)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Se reemplaza de una vez: un corte a mitad de escritura no borra los cupos
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'fecha': datetime.date.today().isoformat(), 'enviados': sent}, f, indent=2)
+        os.replace(self.path + '.tmp', self.path)
+
+
+class SenderAccount:
+    """Una cuenta de envío con su planificador y su estado durante el envío.
+
+    ``config`` tiene las mismas claves que la configuración SMTP de la
+    aplicación; ``por_minuto`` y ``por_dia`` (opcionales) sustituyen a los
+    límites conocidos del proveedor.
+    """
+
+    def __init__(self, config, sent_today=0):
+        self.config = dict(config)
+        self.email = self.config['email']
+        self.pool_size = max(1, int(self.config.get('conexiones', 1)))
+
+        limits = provider_limits(self.config.get('proveedor', ''), self.config['servidor']) or {}
+        self.scheduler = ThrottleScheduler(
+            self.config.get('por_minuto') or limits.get('por_minuto'),
+            self.config.get('por_dia') or limits.get('por_dia'),
+        )
+        self.scheduler.sent_today = sent_today
+
+        self.messages = None  # MessageFactory con este remitente
+        self.disabled = None  # Motivo por el que la cuenta dejó de enviar
+
+    @property
+    def available(self):
+        return self.disabled is None
+
+    def ready(self):
+        """Indica si la cuenta puede enviar ahora mismo (sin pausa por saturación)"""
+        return self.available and self.scheduler.paused_for() == 0
+
+    def __str__(self):
+        return self.email
@@ -0,0 +1,209 @@
+"""Servidor SMTP local que acepta y descarta los correos, para pruebas.
+
+Permite medir el envío sin escribir a nadie: responde como un servidor real
+(EHLO, AUTH, MAIL, RCPT, DATA...) pero no guarda ni reenvía nada. Puede
+simular un servidor lento o inestable con una latencia por correo, una
+proporción de respuestas 4xx y una proporción de desconexiones.
+
+Uso::
+
+    python smtp_sink.py [--puerto 2525] [--latencia 0.05] [--errores 0.01]
+                        [--codigo 451] [--desconexiones 0.001]
+
+El servidor no ofrece STARTTLS: cada cuenta de la lista ``cuentas`` de la
+campaña que apunte a él debe indicar ``"starttls": false`` (ver :mod:`campaign`).
+"""
+import argparse
+import random
+import socketserver
+import sys
+import threading
+import time
+
+# Longitud máxima de una línea de comando (RFC 5321, 4.5.3.1.4) con margen
+MAX_LINE = 4096
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """Atiende una conexión SMTP y descarta los correos recibidos"""
+
+    def reply(self, code, text):
+        self.wfile.write(f"{code} {text}\r\n".encode('ascii'))
+
+    def handle(self):
+        sink = self.server
+        sink.count('conexiones')
+        self.reply(220, "smtp-sink listo")
+
+        while True:
+            line = self.rfile.readline(MAX_LINE)
+            if not line:
+                return  # El cliente cerró la conexión
+            command, _, argument = line.decode('utf-8', 'replace').strip().partition(' ')
+            command = command.upper()
+
+            if command == 'EHLO':
+                self.wfile.write(b"250-smtp-sink\r\n250-8BITMIME\r\n250 AUTH PLAIN LOGIN\r\n")
+            elif command == 'HELO':
+                self.reply(250, "smtp-sink")
+            elif command == 'AUTH':
+                self.authenticate(argument)
+            elif command in ('MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply(250, "OK")
+            elif command == 'DATA':
+                self.reply(354, "Fin de datos con <CRLF>.<CRLF>")
+                if not self.receive_data():
+                    return
+            elif command == 'QUIT':
+                self.reply(221, "Hasta luego")
+                return
+            elif command == 'STARTTLS':
+                self.reply(454, "TLS no disponible")
+            else:
+                self.reply(502, "Comando no implementado")
+
+    def authenticate(self, argument):
+        """Acepta cualquier usuario y contraseña (AUTH PLAIN o LOGIN)"""
+        mechanism, _, initial = argument.partition(' ')
+        mechanism = mechanism.upper()
+        if mechanism == 'PLAIN':
+            if not initial:
+                self.reply(334, "")
+                self.rfile.readline(MAX_LINE)
+        elif mechanism == 'LOGIN':
+            if not initial:
+                self.reply(334, "VXNlcm5hbWU6")  # "Username:"
+                self.rfile.readline(MAX_LINE)
+            self.reply(334, "UGFzc3dvcmQ6")  # "Password:"
+            self.rfile.readline(MAX_LINE)
+        else:
+            self.reply(504, "Mecanismo no soportado")
+            return
+        self.reply(235, "Autenticado")
+
+    def receive_data(self):
+        """Lee y descarta el contenido del correo; devuelve False si se corta la conexión"""
+        sink = self.server
+        size = 0
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return False
+            if line == b".\r\n":
+                break
+            size += len(line)
+
+        if sink.latency:
+            time.sleep(sink.latency)
+
+        outcome = sink.roll()
+        if outcome == 'desconexion':
+            sink.count('desconexiones')
+            return False  # Cierra sin responder, como un servidor caído
+        if outcome == 'error':
+            sink.count('rechazados')
+            self.reply(sink.error_code, "4.3.0 Error temporal simulado")
+            # 421 cierra la sesión (RFC 5321, 3.8)
+            return sink.error_code != 421
+
+        sink.count('correos')
+        sink.count('bytes', size)
+        self.reply(250, "OK: descartado")
+        return True
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Servidor SMTP de pruebas; cada conexión se atiende en su propio hilo.
+
+    ``latency`` son los segundos de espera antes de responder a cada correo;
+    ``error_rate`` y ``disconnect_rate`` son las proporciones (0 a 1) de
+    correos respondidos con ``error_code`` o con un cierre de conexión.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0,
+                 error_code=451, disconnect_rate=0.0, seed=None):
+        super().__init__((host, port), SinkHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.disconnect_rate = disconnect_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.stats = dict.fromkeys(
+            ('conexiones', 'correos', 'rechazados', 'desconexiones', 'bytes'), 0
+        )
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def roll(self):
+        """Decide el resultado de un correo: 'ok', 'error' o 'desconexion'"""
+        with self._lock:
+            value = self._random.random()
+        if value < self.disconnect_rate:
+            return 'desconexion'
+        if value < self.disconnect_rate + self.error_rate:
+            return 'error'
+        return 'ok'
+
+    def start(self):
+        """Atiende conexiones en un hilo de fondo; devuelve el propio servidor"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Servidor SMTP local que descarta los correos")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=2525,
+                        help="puerto de escucha (0 = cualquiera libre)")
+    parser.add_argument('--latencia', type=float, default=0.0,
+                        help="segundos de espera antes de aceptar cada correo")
+    parser.add_argument('--errores', type=float, default=0.0,
+                        help="proporción de correos rechazados con un error 4xx")
+    parser.add_argument('--codigo', type=int, default=451,
+                        help="código de los rechazos (421, 450, 451, 452...)")
+    parser.add_argument('--desconexiones', type=float, default=0.0,
+                        help="proporción de correos en los que se corta la conexión")
+    parser.add_argument('--semilla', type=int, help="semilla para repetir los mismos fallos")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    sink = SMTPSink(args.host, args.puerto, args.latencia, args.errores,
+                    args.codigo, args.desconexiones, args.semilla)
+    print(f"Servidor SMTP de pruebas escuchando en {args.host}:{sink.port}", flush=True)
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.server_close()
+        print(", ".join(f"{key}: {value}" for key, value in sink.stats.items()), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Motor de plantillas para los mensajes personalizados.
+
+La plantilla del editor se analiza una sola vez y se compila en una lista de
+segmentos literales y marcadores ``{columna}``. Al personalizar cada fila
+solo se consultan las columnas que la plantilla usa realmente, en lugar de
+recorrer todas las columnas del Excel con ``str.replace`` sobre el mensaje
+completo.
+
+Para escribir una llave literal se duplica: ``{{`` y ``}}``.
+"""
+import re
+
+# Un marcador es cualquier texto entre llaves sin llaves ni saltos de línea;
+# ``{{`` y ``}}`` son llaves literales escapadas
+PLACEHOLDER_RE = re.compile(r"\{\{|\}\}|\{([^{}\n]+)\}")
+
+
+class TemplateError(ValueError):
+    """La plantilla usa marcadores que no corresponden a ninguna columna"""
+
+    def __init__(self, unknown):
+        self.unknown = unknown
+        super().__init__(
+            "Marcadores sin columna en el Excel: "
+            + ", ".join(f"{{{name}}}" for name in unknown)
+        )
+
+
+class CompiledTemplate:
+    """Plantilla compilada en segmentos literales y marcadores.
+
+    ``segments`` alterna texto literal (posiciones pares) y nombres de
+    columna (posiciones impares), siempre empezando y terminando en literal.
+    """
+
+    def __init__(self, segments, labels=None):
+        self.segments = segments
+        self.literals = segments[0::2]
+        self.fields = segments[1::2]
+        # Columnas distintas que usa la plantilla, en orden de aparición
+        self.columns = list(dict.fromkeys(self.fields))
+        # Etiqueta real de cada columna en el DataFrame (pueden no ser texto)
+        labels = labels or {}
+        self.labels = {name: labels.get(name, name) for name in self.columns}
+        # Plantilla equivalente para str.format, con los literales escapados
+        escaped = [literal.replace("{", "{{").replace("}", "}}") for literal in self.literals]
+        self._format = "{}".join(escaped)
+
+    def render_frame(self, df):
+        """Personaliza la plantilla para todas las filas de ``df`` a la vez.
+
+        Convierte a texto solo las columnas usadas, trabajando sobre la
+        columna completa, y arma los mensajes con un único ``str.format`` por
+        fila. Devuelve una lista de mensajes en el orden de ``df``.
+        """
+        if not self.fields:
+            return [self.literals[0]] * len(df)
+
+        # Texto de cada columna usada; los vacíos conservan el marcador
+        values = {}
+        for name, label in self.labels.items():
+            column = df[label]
+            values[name] = column.astype(str).where(column.notna(), f"{{{name}}}").tolist()
+
+        return [self._format.format(*row) for row in zip(*(values[f] for f in self.fields))]
+
+
+def split_template(text):
+    """Divide el texto en literales y marcadores alternos, resolviendo ``{{``/``}}``"""
+    segments = []
+    literal = []
+    position = 0
+    for match in PLACEHOLDER_RE.finditer(text):
+        literal.append(text[position:match.start()])
+        position = match.end()
+        if match.group(1) is None:
+            literal.append(match.group(0)[0])  # Llave escapada
+        else:
+            segments.append("".join(literal))
+            segments.append(match.group(1))
+            literal = []
+    literal.append(text[position:])
+    segments.append("".join(literal))
+    return segments
+
+
+def compile_template(text, columns=None):
+    """Compila el texto de una plantilla.
+
+    Si se indican ``columns``, los marcadores que no correspondan a ninguna
+    columna provocan un :class:`TemplateError`.
+    """
+    segments = split_template(text)
+    labels = None
+
+    if columns is not None:
+        labels = {str(col): col for col in columns}
+        unknown = [name for name in dict.fromkeys(segments[1::2]) if name not in labels]
+        if unknown:
+            raise TemplateError(unknown)
+
+    return CompiledTemplate(segments, labels)
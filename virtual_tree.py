@@ -0,0 +1,185 @@
+"""Vista de tabla virtualizada para DataFrames grandes.
+
+Insertar cien mil filas en un ``ttk.Treeview`` congela Tk. Esta vista solo
+mantiene en el widget las filas que caben en pantalla y, al desplazarse,
+reemplaza sus valores con los de la porción correspondiente del DataFrame.
+El orden por columna y la búsqueda se calculan sobre el DataFrame, no sobre
+el widget.
+
+numpy y pandas se importan al recibir el primer DataFrame: crear la vista
+vacía no debe retrasar la aparición de la ventana.
+"""
+import tkinter as tk
+from tkinter import ttk
+
+DEFAULT_ROW_HEIGHT = 20
+
+
+class VirtualTreeview(ttk.Frame):
+    """Treeview que muestra un DataFrame completo insertando solo las filas visibles"""
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.df = None
+        self.order = ()  # Posiciones de las filas a mostrar, en orden (array de numpy)
+        self.offset = 0  # Primera fila visible dentro de self.order
+        self.visible_rows = 1
+        self.sort_column = None
+        self.sort_ascending = True
+
+        self.tree = ttk.Treeview(self, show='headings', selectmode='browse')
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.on_scrollbar)
+        self.xscrollbar = ttk.Scrollbar(self, orient='horizontal', command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.xscrollbar.set)
+
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        self.scrollbar.grid(row=0, column=1, sticky='ns')
+        self.xscrollbar.grid(row=1, column=0, sticky='we')
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        row_height = ttk.Style().lookup('Treeview', 'rowheight')
+        self.row_height = int(row_height) if row_height else DEFAULT_ROW_HEIGHT
+
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<MouseWheel>', self.on_mousewheel)
+        self.tree.bind('<Button-4>', lambda event: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda event: self.scroll(3))
+        self.tree.bind('<Prior>', lambda event: self.scroll(-self.visible_rows))
+        self.tree.bind('<Next>', lambda event: self.scroll(self.visible_rows))
+        self.tree.bind('<Home>', lambda event: self.scroll_to(0))
+        self.tree.bind('<End>', lambda event: self.scroll_to(len(self.order)))
+
+    @property
+    def row_count(self):
+        """Número de filas tras aplicar la búsqueda"""
+        return len(self.order)
+
+    def set_dataframe(self, df):
+        """Muestra un nuevo DataFrame (o ninguno, con None)"""
+        self.df = df
+        self.sort_column = None
+        self.sort_ascending = True
+        self.tree.delete(*self.tree.get_children())
+
+        if df is None:
+            self.order = ()
+            self.tree['columns'] = []
+        else:
+            import numpy as np
+
+            self.order = np.arange(len(df))
+            columns = [str(col) for col in df.columns]
+            self.tree['columns'] = columns
+            for position, col in enumerate(columns):
+                self.tree.heading(col, text=col, command=lambda p=position: self.sort_by(p))
+                self.tree.column(col, width=100, minwidth=50, anchor='w', stretch=False)
+
+        self.scroll_to(0)
+
+    def sort_by(self, position):
+        """Ordena por la columna indicada; un segundo clic invierte el orden"""
+        if self.df is None:
+            return
+        if self.sort_column == position:
+            self.sort_ascending = not self.sort_ascending
+        else:
+            self.sort_column, self.sort_ascending = position, True
+
+        # Ordena las posiciones actuales (respeta la búsqueda vigente)
+        column = self.df.iloc[self.order, position].reset_index(drop=True)
+        try:
+            ranked = column.sort_values(ascending=self.sort_ascending, kind='stable',
+                                        na_position='last')
+        except TypeError:
+            # Columnas con tipos mezclados: se ordenan como texto
+            ranked = column.astype(str).sort_values(ascending=self.sort_ascending, kind='stable')
+        self.order = self.order[ranked.index.to_numpy()]
+
+        arrow = " ▲" if self.sort_ascending else " ▼"
+        for p, col in enumerate(self.tree['columns']):
+            self.tree.heading(col, text=col + (arrow if p == position else ""))
+        self.scroll_to(0)
+
+    def search(self, text):
+        """Filtra las filas que contienen ``text`` en alguna columna"""
+        if self.df is None:
+            return
+        import numpy as np
+
+        text = text.strip()
+        if not text:
+            self.order = np.arange(len(self.df))
+        else:
+            mask = np.zeros(len(self.df), dtype=bool)
+            for col in self.df.columns:
+                values = self.df[col]
+                mask |= values.astype(str).str.contains(text, case=False, regex=False).to_numpy() \
+                    & values.notna().to_numpy()
+            self.order = np.flatnonzero(mask)
+
+        self.sort_column = None
+        for col in self.tree['columns']:
+            self.tree.heading(col, text=col)
+        self.scroll_to(0)
+
+    def on_resize(self, event):
+        """Recalcula cuántas filas caben en pantalla"""
+        # Descuenta el alto aproximado del encabezado
+        rows = max(1, (event.height - self.row_height) // self.row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.refresh()
+
+    def on_mousewheel(self, event):
+        # En Windows event.delta es múltiplo de 120; en macOS es pequeño
+        step = -event.delta // 120 if abs(event.delta) >= 120 else -event.delta
+        self.scroll(step * 3)
+        return 'break'
+
+    def on_scrollbar(self, action, value, unit=None):
+        """Atiende los comandos de la barra de desplazamiento"""
+        if action == 'moveto':
+            self.scroll_to(int(float(value) * len(self.order)))
+        elif action == 'scroll':
+            step = self.visible_rows if unit == 'pages' else 1
+            self.scroll(int(value) * step)
+
+    def scroll(self, rows):
+        self.scroll_to(self.offset + rows)
+        return 'break'
+
+    def scroll_to(self, offset):
+        """Hace visible la página que empieza en ``offset``"""
+        self.offset = max(0, min(offset, len(self.order) - self.visible_rows))
+        self.refresh()
+        return 'break'
+
+    def refresh(self):
+        """Vuelca en el widget los valores de las filas visibles"""
+        if self.df is None:
+            self.scrollbar.set(0, 1)
+            return
+        import pandas as pd
+
+        positions = self.order[self.offset:self.offset + self.visible_rows]
+        page = self.df.iloc[positions]
+        rows = [
+            ['' if pd.isna(value) else value for value in row]
+            for row in page.itertuples(index=False)
+        ]
+
+        # Reutiliza los elementos existentes; solo se crean o borran los que sobran
+        items = self.tree.get_children()
+        for item, values in zip(items, rows):
+            self.tree.item(item, values=values)
+        for values in rows[len(items):]:
+            self.tree.insert('', tk.END, values=values)
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+
+        total = len(self.order)
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + len(rows)) / total)
+        else:
+            self.scrollbar.set(0, 1)